@@ -1,22 +1,18 @@
 from flask import Flask, request, jsonify
 import pymysql
-import os
+import db_pool
+import aggregates
 from dotenv import load_dotenv
 from llm import do as llm_do  # llm.py 파일에서 do 함수를 import
+from llm import do_many as llm_do_many
+import llm_gateway
 
 # 환경 변수 로드
 print("Loading .env file...")
 load_dotenv()
 
 app = Flask(__name__)
-
-# DB Connection
-db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
-}
+llm_gateway.init_app(app)
 
 @app.route('/api/add_food', methods=['POST'])
 def add_food():
@@ -32,13 +28,11 @@ def add_food():
     # LLM을 통해 음식 영양 정보를 가져옴
     nutrition_info = llm_do(food_name)
 
+    connection = db_pool.get_connection()
     try:
-        connection = pymysql.connect(**db_config)
         with connection.cursor() as cursor:
             # FOOD_INDEX를 구함 (해당 날짜의 가장 높은 인덱스를 찾아 +1)
-            cursor.execute("SELECT MAX(FOOD_INDEX) FROM FOOD WHERE ID = %s AND DATE = %s", (user_id, date))
-            max_index = cursor.fetchone()[0]
-            food_index = max_index + 1 if max_index is not None else 0
+            food_index = aggregates.next_food_index(cursor, user_id, date)
 
             insert_query = """
             INSERT INTO FOOD (ID, DATE, FOOD_INDEX, FOOD_NAME, FOOD_CH, FOOD_PT, FOOD_FAT, FOOD_KCAL)
@@ -52,6 +46,8 @@ def add_food():
                 nutrition_info['fat'],
                 nutrition_info['calorie']
             ))
+            # 같은 트랜잭션에서 USER_NT 일별 합계 갱신
+            aggregates.on_food_insert(cursor, user_id, date, nutrition_info)
             connection.commit()
 
             added_food_info = {
@@ -73,5 +69,76 @@ def add_food():
     finally:
         connection.close()
 
+# 한 번에 추가할 수 있는 최대 음식 수
+MAX_BATCH_SIZE = 20
+
+@app.route('/api/add_food/batch', methods=['POST'])
+def add_food_batch():
+    data = request.json
+
+    user_id = data.get('ID')
+    date = data.get('DATE')
+    food_names = data.get('FOOD_NAMES')
+
+    if not user_id or not date or not food_names:
+        return jsonify({"error": "필수 정보가 누락되었습니다."}), 400
+
+    if not isinstance(food_names, list) or not all(isinstance(name, str) and name.strip() for name in food_names):
+        return jsonify({"error": "FOOD_NAMES는 음식 이름 목록이어야 합니다."}), 400
+
+    if len(food_names) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"한 번에 최대 {MAX_BATCH_SIZE}개까지 추가할 수 있습니다."}), 400
+
+    # LLM을 통해 모든 음식의 영양 정보를 동시에 가져옴
+    nutrition_infos = llm_do_many(food_names)
+
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            # 연속된 FOOD_INDEX를 한 번에 할당 (동시에 추가되는 요청과 겹치지 않도록 잠금)
+            first_index = aggregates.next_food_index(cursor, user_id, date)
+
+            rows = [
+                (
+                    user_id, date, first_index + i,
+                    nutrition_info['food_name'],
+                    nutrition_info['carbohydrate'],
+                    nutrition_info['protein'],
+                    nutrition_info['fat'],
+                    nutrition_info['calorie']
+                )
+                for i, nutrition_info in enumerate(nutrition_infos)
+            ]
+            insert_query = """
+            INSERT INTO FOOD (ID, DATE, FOOD_INDEX, FOOD_NAME, FOOD_CH, FOOD_PT, FOOD_FAT, FOOD_KCAL)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            cursor.executemany(insert_query, rows)
+            # 같은 트랜잭션에서 USER_NT 일별 합계 갱신
+            aggregates.on_food_insert_many(cursor, user_id, date, nutrition_infos)
+            connection.commit()
+
+            added_foods = [
+                {
+                    "ID": row[0],
+                    "DATE": row[1],
+                    "FOOD_INDEX": row[2],
+                    "FOOD_NAME": row[3],
+                    "FOOD_CH": row[4],
+                    "FOOD_PT": row[5],
+                    "FOOD_FAT": row[6],
+                    "FOOD_KCAL": row[7]
+                }
+                for row in rows
+            ]
+
+            return jsonify({"message": "음식이 성공적으로 추가되었습니다.", "data": added_foods}), 201
+
+    except pymysql.MySQLError as e:
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        connection.close()
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -1,35 +1,37 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+import json
 import pymysql
+import db_pool
+import food_loader
+import fast_json
+import data_version
+import stats
+import prefix_index
+import llm_gateway
 import os
 from dotenv import load_dotenv
 import logging
-import calendar
 from langchain.chat_models import AzureChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 
 load_dotenv()
 
 app = Flask(__name__)
-
-# DB Connection
-db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
-}
+app.json = fast_json.JSONProvider(app)
+llm_gateway.init_app(app)
 
 # Logger 설정
 logging.basicConfig(level=logging.DEBUG)
 
 # Azure OpenAI 클라이언트 초기화
-model = AzureChatOpenAI(
+model = llm_gateway.GatewayChatModel(AzureChatOpenAI(
     azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),  # gpt-4o is set by env
-    temperature=1.0
-)
+    temperature=1.0,
+    max_retries=0
+))
 
 def get_user_nutritional_needs(user_id):
-    connection = pymysql.connect(**db_config)
+    connection = db_pool.get_connection()
     try:
         with connection.cursor() as cursor:
             sql = "SELECT BODY_WEIGHT, RDI FROM USER WHERE ID = %s"
@@ -46,67 +48,33 @@ def get_user_nutritional_needs(user_id):
     finally:
         connection.close()
 
-def get_daily_totals(user_id, date):
-    connection = pymysql.connect(**db_config)
-    try:
-        with connection.cursor() as cursor:
-            sql = "SELECT CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT FROM USER_NT WHERE ID = %s AND DATE = %s"
-            cursor.execute(sql, (user_id, date))
-            result = cursor.fetchone()
-            if result:
-                return result
-            else:
-                return None
-    except pymysql.MySQLError as e:
-        logging.error(f"Database error: {e}")
-        return None
-    finally:
-        connection.close()
+# USER_NT 행이 없는 날의 백분율 기본값
+EMPTY_PERCENTAGES = {}
 
 def get_monthly_data(year, month, user_id):
-    connection = pymysql.connect(**db_config)
+    return food_loader.load_month(year, month, user_id, EMPTY_PERCENTAGES)
+
+def get_monthly_rollup(year, month, user_id):
+    # aggregates.py가 FOOD 변경 때마다 갱신하는 월간 집계 한 행
+    connection = db_pool.get_connection()
     try:
         with connection.cursor() as cursor:
             sql = """
-                SELECT DATE, FOOD_INDEX, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL
-                FROM FOOD
-                WHERE YEAR(DATE) = %s AND MONTH(DATE) = %s AND ID = %s
-                ORDER BY DATE
+                SELECT ITEM_COUNT, DAY_COUNT, KCAL_SUM, CARBO_PCT_SUM, PROTEIN_PCT_SUM, FAT_PCT_SUM, VERSION
+                FROM USER_NT_MONTHLY
+                WHERE ID = %s AND YEAR = %s AND MONTH = %s
             """
-            cursor.execute(sql, (year, month, user_id))
-            results = cursor.fetchall()
-
-            num_days = calendar.monthrange(year, month)[1]  # 해당 월의 일수 계산
-            foods_list = [[] for _ in range(num_days)]  # 각 날짜별 음식 리스트
-            percentages_list = [{} for _ in range(num_days)]  # 각 날짜별 백분율 리스트
-
-            for row in results:
-                day = row[0].day - 1  # 0-based index for lists
-                food_info = {
-                    "food_index": row[1],
-                    "food_name": row[2],
-                    "protein": row[3],
-                    "fat": row[4],
-                    "carbohydrates": row[5],
-                    "calories": row[6]
-                }
-                foods_list[day].append(food_info)
-
-            # Add daily percentages
-            for day in range(num_days):
-                date_str = f"{year}-{str(month).zfill(2)}-{str(day+1).zfill(2)}"  # 1-based day for dates
-                daily_totals = get_daily_totals(user_id, date_str)
-                if daily_totals:
-                    carb_total, protein_total, fat_total, rd_carb, rd_protein, rd_fat = daily_totals
-                    percentages_list[day] = {
-                        "carbohydrates_percentage": round((carb_total / rd_carb) * 100, 1) if rd_carb > 0 else 0,
-                        "protein_percentage": round((protein_total / rd_protein) * 100, 1) if rd_protein > 0 else 0,
-                        "fat_percentage": round((fat_total / rd_fat) * 100, 1) if rd_fat > 0 else 0
-                    }
-
+            cursor.execute(sql, (user_id, year, month))
+            result = cursor.fetchone() or (0, 0, 0, 0, 0, 0, 0)
+            item_count, day_count, kcal_sum, carbo_pct_sum, protein_pct_sum, fat_pct_sum, version = result
             return {
-                "foods": foods_list,
-                "percentages": percentages_list
+                "version": version,
+                "item_count": item_count,
+                "day_count": day_count,
+                "kcal_sum": kcal_sum,
+                "carbohydrates_percentage_sum": carbo_pct_sum,
+                "protein_percentage_sum": protein_pct_sum,
+                "fat_percentage_sum": fat_pct_sum
             }
     except pymysql.MySQLError as e:
         logging.error(f"Database error: {e}")
@@ -115,6 +83,7 @@ def get_monthly_data(year, month, user_id):
         connection.close()
 
 @app.route('/api/food/quarterly', methods=['GET'])
+@fast_json.compressed
 def get_quarterly_food():
     year = request.args.get('year')
     start_month = request.args.get('month')
@@ -131,28 +100,70 @@ def get_quarterly_food():
     except ValueError:
         return jsonify({"error": "Year and month must be integers."}), 400
 
-    quarterly_data = {}
-    for i in range(-1, 2):  # 이전 달, 현재 달, 다음 달 순서로 데이터를 가져오기
-        month = (start_month + i - 1) % 12 + 1
-        current_year = year + (start_month + i - 1) // 12
-        monthly_data = get_monthly_data(current_year, month, user_id)
-        quarterly_data[f"{current_year}-{str(month).zfill(2)}"] = monthly_data
+    # 이전 달, 현재 달, 다음 달 세 달 구간을 한 번에 가져오기
+    months = food_loader.quarter_months(year, start_month)
+    # 구간에 바뀐 기록이 없으면 데이터를 읽지 않고 304
+    etag = data_version.range_etag("quarterly", user_id, *food_loader.months_range(months))
+    if data_version.is_fresh(etag):
+        return data_version.not_modified(etag)
+    quarterly_data = food_loader.load_months(months, user_id, EMPTY_PERCENTAGES)
+    if any("error" in data for data in quarterly_data.values()):
+        etag = None  # 오류 응답은 캐시되지 않도록
+
+    return data_version.with_etag(jsonify(quarterly_data), etag)
+
+def get_cached_advice(year, month, user_id, version):
+    # 같은 달 데이터 버전으로 만들어 둔 조언이 있으면 반환
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = """
+                SELECT ADVICE FROM ADVICE_CACHE
+                WHERE ID = %s AND YEAR = %s AND MONTH = %s AND DATA_VERSION = %s
+            """
+            cursor.execute(sql, (user_id, year, month, version))
+            result = cursor.fetchone()
+            return result[0] if result else None
+    except pymysql.MySQLError as e:
+        logging.error(f"Database error: {e}")
+        return None
+    finally:
+        connection.close()
+
+def save_cached_advice(year, month, user_id, version, advice):
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = """
+                INSERT INTO ADVICE_CACHE (ID, YEAR, MONTH, DATA_VERSION, ADVICE, CREATED_AT)
+                VALUES (%s, %s, %s, %s, %s, NOW())
+                ON DUPLICATE KEY UPDATE DATA_VERSION = VALUES(DATA_VERSION), ADVICE = VALUES(ADVICE),
+                                        CREATED_AT = VALUES(CREATED_AT)
+            """
+            cursor.execute(sql, (user_id, year, month, version, advice))
+        connection.commit()
+    except pymysql.MySQLError as e:
+        logging.error(f"Database error: {e}")
+    finally:
+        connection.close()
 
-    return jsonify(quarterly_data)
+def build_advice_messages(carbohydrates_percentage, protein_percentage, fat_percentage):
+    # 일반 응답과 스트리밍 응답이 같은 프롬프트를 쓰도록 한 곳에서 만든다
+    return [
+        SystemMessage(content="You are a nutrition expert providing dietary advice based on user's nutrient intake.Give 5 sentences of advice in Korean"),
+        HumanMessage(content=f"Here are my monthly nutrient intake percentages:\n"
+                             f"Carbohydrates: {carbohydrates_percentage}%\n"
+                             f"Protein: {protein_percentage}%\n"
+                             f"Fat: {fat_percentage}%\n"
+                             f"Please provide advice on how to improve my diet")
+    ]
 
 def get_advice(carbohydrates_percentage, protein_percentage, fat_percentage):
     try:
         # Chat API 호출
-        messages = [
-            SystemMessage(content="You are a nutrition expert providing dietary advice based on user's nutrient intake.Give 5 sentences of advice in Korean"),
-            HumanMessage(content=f"Here are my monthly nutrient intake percentages:\n"
-                                 f"Carbohydrates: {carbohydrates_percentage}%\n"
-                                 f"Protein: {protein_percentage}%\n"
-                                 f"Fat: {fat_percentage}%\n"
-                                 f"Please provide advice on how to improve my diet")
-        ]
+        messages = build_advice_messages(carbohydrates_percentage, protein_percentage, fat_percentage)
         
-        response = model(messages)
+        response = model.invoke(messages)
         
         # 응답 객체의 내용을 로그로 출력
         logging.debug(f"LLM Response Object: {response}")
@@ -165,12 +176,54 @@ def get_advice(carbohydrates_percentage, protein_percentage, fat_percentage):
         logging.error(f"Error in get_advice: {e}")
         logging.debug(f"Carbohydrates: {carbohydrates_percentage}, Protein: {protein_percentage}, Fat: {fat_percentage}")  # 입력 데이터 디버깅
         return {"error": f"Failed to get advice from LLM: {str(e)}"}
-    
+
+def sse_event(event, data):
+    # data는 한 줄 JSON으로 보낸다 (줄바꿈이 있으면 SSE 프레임이 깨짐)
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def wants_stream():
+    # stream=1 파라미터나 Accept: text/event-stream 헤더가 있을 때만 스트리밍
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+def stream_advice(year, month, user_id, version, averages, cached_advice):
+    # averages를 먼저 보내고, 조언은 모델이 만드는 대로 token 이벤트로 보낸다
+    yield sse_event("averages", averages)
+
+    if cached_advice is not None:
+        yield sse_event("token", {"text": cached_advice})
+        yield sse_event("done", {"advice": cached_advice, "cached": True})
+        return
+
+    chunks = []
+    try:
+        messages = build_advice_messages(averages["average_carbohydrates_percentage"],
+                                         averages["average_protein_percentage"],
+                                         averages["average_fat_percentage"])
+        for chunk in model.stream(messages):
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield sse_event("token", {"text": chunk.content})
+    except Exception as e:
+        logging.error(f"Error in stream_advice: {e}")
+        yield sse_event("error", {"error": f"Failed to get advice from LLM: {str(e)}"})
+        return
+
+    advice = "".join(chunks)
+    logging.debug(f"LLM Advice (stream): {advice}")
+    # 끝까지 받은 경우에만 저장
+    if advice:
+        save_cached_advice(year, month, user_id, version, advice)
+    yield sse_event("done", {"advice": advice, "cached": False})
+
 @app.route('/api/food/advice', methods=['GET'])
 def get_advice_route():
     year = request.args.get('year')
     month = request.args.get('month')
     user_id = request.args.get('user_id')
+    # refresh=1 이면 저장된 조언을 무시하고 새로 생성
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
 
     if not year or not month or not user_id:
         return jsonify({"error": "Year, month, and user_id are required"}), 400
@@ -183,35 +236,23 @@ def get_advice_route():
     except ValueError:
         return jsonify({"error": "Year and month must be integers."}), 400
 
-    # 현재 달의 데이터를 가져옵니다
-    monthly_data = get_monthly_data(year, month, user_id)
+    # 현재 달의 월간 집계를 가져옵니다
+    rollup = get_monthly_rollup(year, month, user_id)
 
-    if "error" in monthly_data:
-        logging.error(f"Failed to get monthly data: {monthly_data['error']}")
-        return jsonify(monthly_data), 500
+    if "error" in rollup:
+        logging.error(f"Failed to get monthly rollup: {rollup['error']}")
+        return jsonify(rollup), 500
 
-    percentages_list = monthly_data['percentages']
-
-    # 한 달치 평균 계산
-    total_carbs = 0
-    total_protein = 0
-    total_fat = 0
-    count = 0
-
-    for day_data in percentages_list:
-        if day_data:  # 빈 데이터는 건너뜀
-            total_carbs += day_data.get('carbohydrates_percentage', 0)
-            total_protein += day_data.get('protein_percentage', 0)
-            total_fat += day_data.get('fat_percentage', 0)
-            count += 1
+    # 한 달치 평균 계산 (USER_NT 기록이 있는 날 기준)
+    count = rollup['day_count']
 
     if count == 0:
         logging.error("No valid data to calculate averages")
         return jsonify({"error": "No valid data to calculate averages"}), 404
 
-    average_carbs = total_carbs / count
-    average_protein = total_protein / count
-    average_fat = total_fat / count
+    average_carbs = rollup['carbohydrates_percentage_sum'] / count
+    average_protein = rollup['protein_percentage_sum'] / count
+    average_fat = rollup['fat_percentage_sum'] / count
 
     averages = {
         "average_carbohydrates_percentage": round(average_carbs, 1),
@@ -219,11 +260,29 @@ def get_advice_route():
         "average_fat_percentage": round(average_fat, 1)
     }
 
+    # 이 달 데이터가 바뀌지 않았다면 저장된 조언을 그대로 사용
+    cached_advice = None
+    if not refresh:
+        cached_advice = get_cached_advice(year, month, user_id, rollup['version'])
+
+    if wants_stream():
+        return Response(stream_with_context(stream_advice(year, month, user_id, rollup['version'], averages, cached_advice)),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    if cached_advice is not None:
+        logging.debug(f"Cached LLM Advice: {cached_advice}")
+        return jsonify({"averages": averages, "advice": cached_advice})
+
     # LLM을 통해 조언을 받습니다
     advice = get_advice(averages["average_carbohydrates_percentage"],
                         averages["average_protein_percentage"],
                         averages["average_fat_percentage"])
 
+    # 오류 응답(dict)은 저장하지 않음
+    if isinstance(advice, str):
+        save_cached_advice(year, month, user_id, rollup['version'], advice)
+
     # 콘솔에 출력
     logging.debug(f"LLM Advice: {advice}")
 
@@ -246,31 +305,73 @@ def get_avg_kcal():
     except ValueError:
         return jsonify({"error": "Year and month must be integers."}), 400
 
-    # 현재 달의 데이터를 가져옵니다
-    monthly_data = get_monthly_data(year, month, user_id)
-
-    if "error" in monthly_data:
-        logging.error(f"Failed to get monthly data: {monthly_data['error']}")
-        return jsonify(monthly_data), 500
-
-    foods_list = monthly_data['foods']
+    # 현재 달의 월간 집계를 가져옵니다
+    rollup = get_monthly_rollup(year, month, user_id)
 
-    # 한 달치 평균 칼로리 계산
-    total_kcal = 0
-    count = 0
+    if "error" in rollup:
+        logging.error(f"Failed to get monthly rollup: {rollup['error']}")
+        return jsonify(rollup), 500
 
-    for day_foods in foods_list:
-        for food in day_foods:
-            total_kcal += food.get('calories', 0)
-            count += 1
+    # 한 달치 평균 칼로리 계산 (음식 항목 기준)
+    count = rollup['item_count']
 
     if count == 0:
         logging.error("No valid data to calculate averages")
         return jsonify({"error": "No valid data to calculate averages"}), 404
 
-    average_kcal = total_kcal / count
+    average_kcal = rollup['kcal_sum'] / count
 
     return jsonify({"average_kcal": round(average_kcal, 1)})
 
+# 임의 구간의 합계/평균 - 누적합 인덱스로 구간 길이와 상관없이 조회 두 번
+# start, end: YYYY-MM-DD (end 포함)
+@app.route('/api/food/range_summary', methods=['GET'])
+def get_range_summary():
+    start = request.args.get('start')
+    end = request.args.get('end')
+    user_id = request.args.get('user_id')
+
+    if not start or not end or not user_id:
+        return jsonify({"error": "start, end, and user_id are required"}), 400
+
+    try:
+        start, end = stats.parse_range(start, end, max_days=None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    summary = prefix_index.range_totals(user_id, start, end)
+
+    if "error" in summary:
+        logging.error(f"Failed to get range summary: {summary['error']}")
+        return jsonify(summary), 500
+
+    return jsonify(summary)
+
+# 임의 구간(여러 해 가능)의 칼로리/영양소 통계
+# start, end: YYYY-MM-DD (end 포함), series=0 이면 날짜별 배열(daily)을 빼고 요약만
+@app.route('/api/food/stats', methods=['GET'])
+@fast_json.compressed
+def get_food_stats():
+    start = request.args.get('start')
+    end = request.args.get('end')
+    user_id = request.args.get('user_id')
+    with_series = request.args.get('series', '1').lower() not in ('0', 'false', 'no')
+
+    if not start or not end or not user_id:
+        return jsonify({"error": "start, end, and user_id are required"}), 400
+
+    try:
+        start, end = stats.parse_range(start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = stats.range_stats(user_id, start, end, with_series)
+
+    if "error" in result:
+        logging.error(f"Failed to get stats: {result['error']}")
+        return jsonify(result), 500
+
+    return jsonify(result)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)  # 다른 포트로
\ No newline at end of file
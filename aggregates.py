@@ -0,0 +1,308 @@
+# aggregates.py
+# FOOD 변경(추가/수정/삭제)과 같은 트랜잭션 안에서 USER_NT 일별 합계와
+# USER_NT_MONTHLY 월간 집계(+ 데이터 버전), USER_NT_PREFIX 누적합을 증분 갱신하고,
+# 그 날의 데이터 버전(ETag용)을 올린다.
+# 각 엔드포인트는 FOOD를 바꾸기 직전에 on_food_insert / on_food_update / on_food_delete를
+# 같은 cursor로 호출하고, 평소처럼 commit 한다.
+# 잠금 순서: 모든 FOOD 쓰기는 USER 행(lock_user) -> FOOD 순서로 잠근다. 순서가 다른 경로가 하나라도 있으면
+# 같은 사용자의 추가와 수정/삭제가 서로 교착 상태에 빠지므로, INSERT를 먼저 실행하는 경로도 lock_user를 먼저 호출한다.
+#
+# 일괄 재계산:
+#   python aggregates.py rebuild USER_ID START_DATE END_DATE   # END_DATE 포함, YYYY-MM-DD
+#   python aggregates.py backfill-monthly [USER_ID]            # 기존 기록으로 월간 집계 채우기
+
+import re
+import sys
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pymysql
+import db_pool
+import data_version
+import prefix_index
+from food_loader import calc_percentages
+
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def to_number(value):
+    # LLM 결과는 "1400", "1400kcal", "50g" 같은 문자열이라 앞쪽 숫자만 사용
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    match = NUMBER_PATTERN.search(str(value).replace(",", ""))
+    return float(match.group()) if match else 0.0
+
+
+def to_day(value):
+    # FOOD.DATE에는 날짜 문자열과 datetime.now()가 섞여 들어오므로 날짜 단위로 맞춘다
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def nutrition_values(nutrition_info):
+    # (탄수화물, 단백질, 지방, 칼로리)
+    return (
+        to_number(nutrition_info['carbohydrate']),
+        to_number(nutrition_info['protein']),
+        to_number(nutrition_info['fat']),
+        to_number(nutrition_info['calorie'])
+    )
+
+
+def latest_recommended(cursor, user_id):
+    # 새로 만드는 USER_NT 행의 권장량(RD_*)은 가장 최근 행에서 가져온다
+    cursor.execute("""
+        SELECT RD_CARBO, RD_PROTEIN, RD_FAT FROM USER_NT
+        WHERE ID = %s AND RD_CARBO IS NOT NULL
+        ORDER BY DATE DESC LIMIT 1
+    """, (user_id,))
+    row = cursor.fetchone()
+    return tuple(row) if row else (0, 0, 0)
+
+
+def lock_user(cursor, user_id):
+    # 같은 사용자의 FOOD 쓰기를 직렬화 - 이미 있는 USER 행 하나만 잠그므로 갭 락끼리 교착 상태가 생기지 않는다
+    cursor.execute("SELECT ID FROM USER WHERE ID = %s FOR UPDATE", (user_id,))
+
+
+def next_food_index(cursor, user_id, food_date):
+    # 새 FOOD 행(들)의 첫 FOOD_INDEX (그 날짜의 가장 높은 인덱스 + 1)
+    # 단일/일괄 추가가 모두 이 함수를 거쳐야 동시에 추가되는 요청끼리 인덱스가 겹치지 않는다
+    lock_user(cursor, user_id)
+    cursor.execute("SELECT MAX(FOOD_INDEX) FROM FOOD WHERE ID = %s AND DATE = %s FOR UPDATE", (user_id, food_date))
+    max_index = cursor.fetchone()[0]
+    return max_index + 1 if max_index is not None else 0
+
+
+def apply_daily_delta(cursor, user_id, day, delta):
+    # delta: (탄수화물, 단백질, 지방, 칼로리) 증감량
+    # 반환값: 변경 전/후 (CARBO, PROTEIN, FAT, KCAL, RD_CARBO, RD_PROTEIN, RD_FAT), 새 행이면 변경 전은 None
+    # 없는 행을 SELECT ... FOR UPDATE로 확인한 뒤 INSERT하면 InnoDB 갭 락 때문에
+    # 인접한 날짜의 첫 기록 두 개가 서로 교착 상태에 빠지므로, 바로 INSERT ... ON DUPLICATE KEY UPDATE 한다.
+    recommended = latest_recommended(cursor, user_id)
+    cursor.execute("""
+        INSERT INTO USER_NT (ID, DATE, CARBO, PROTEIN, FAT, KCAL, RD_CARBO, RD_PROTEIN, RD_FAT)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            CARBO = CARBO + VALUES(CARBO), PROTEIN = PROTEIN + VALUES(PROTEIN),
+            FAT = FAT + VALUES(FAT), KCAL = KCAL + VALUES(KCAL)
+    """, (user_id, day, *delta, *recommended))
+    # 영향받은 행 수: 1 = 새로 추가, 2 = 기존 행 변경, 0 = 기존 행이고 변화량 0 (CLIENT.FOUND_ROWS를 쓰지 않으므로)
+    inserted = cursor.rowcount == 1
+
+    cursor.execute("""
+        SELECT CARBO, PROTEIN, FAT, KCAL, RD_CARBO, RD_PROTEIN, RD_FAT
+        FROM USER_NT WHERE ID = %s AND DATE = %s
+    """, (user_id, day))
+    after = tuple(cursor.fetchone())
+    if inserted:
+        return None, after
+    before = tuple(to_number(new) - change for new, change in zip(after[:4], delta)) + after[4:]
+    return before, after
+
+
+def daily_percentages(row):
+    # row: (CARBO, PROTEIN, FAT, KCAL, RD_CARBO, RD_PROTEIN, RD_FAT) - 캘린더 응답과 같은 방식으로 계산
+    values = [to_number(value) for value in row]
+    percentages = calc_percentages(values[:3] + values[4:7])
+    return (
+        percentages["carbohydrates_percentage"],
+        percentages["protein_percentage"],
+        percentages["fat_percentage"]
+    )
+
+
+def apply_monthly_delta(cursor, user_id, day, item_change, kcal_change, day_change, percentage_change):
+    cursor.execute("""
+        INSERT INTO USER_NT_MONTHLY
+            (ID, YEAR, MONTH, ITEM_COUNT, DAY_COUNT, KCAL_SUM, CARBO_PCT_SUM, PROTEIN_PCT_SUM, FAT_PCT_SUM, VERSION)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 1)
+        ON DUPLICATE KEY UPDATE
+            VERSION = VERSION + 1,
+            ITEM_COUNT = ITEM_COUNT + VALUES(ITEM_COUNT),
+            DAY_COUNT = DAY_COUNT + VALUES(DAY_COUNT),
+            KCAL_SUM = KCAL_SUM + VALUES(KCAL_SUM),
+            CARBO_PCT_SUM = CARBO_PCT_SUM + VALUES(CARBO_PCT_SUM),
+            PROTEIN_PCT_SUM = PROTEIN_PCT_SUM + VALUES(PROTEIN_PCT_SUM),
+            FAT_PCT_SUM = FAT_PCT_SUM + VALUES(FAT_PCT_SUM)
+    """, (user_id, day.year, day.month, item_change, day_change, kcal_change, *percentage_change))
+
+
+def apply_food_delta(cursor, user_id, day, delta, item_change):
+    # 일별 합계를 바꾸고, 그 결과로 달라진 일별 백분율과 항목 수/칼로리를 월간 집계에 반영
+    # 먼저 USER 행을 잠가서 같은 사용자의 집계 갱신(없는 행 추가 포함)이 차례로 실행되게 한다
+    lock_user(cursor, user_id)
+    data_version.bump(cursor, user_id, day)
+    before, after = apply_daily_delta(cursor, user_id, day, delta)
+    before_percentages = daily_percentages(before) if before else (0, 0, 0)
+    after_percentages = daily_percentages(after)
+    day_change = 0 if before else 1
+    apply_monthly_delta(
+        cursor, user_id, day,
+        item_change=item_change,
+        kcal_change=delta[3],
+        day_change=day_change,
+        percentage_change=tuple(round(new - old, 1) for new, old in zip(after_percentages, before_percentages))
+    )
+    prefix_index.apply_delta(cursor, user_id, day, delta, item_change, day_change)
+
+
+def select_food_values(cursor, user_id, food_date, food_index):
+    cursor.execute("""
+        SELECT FOOD_CH, FOOD_PT, FOOD_FAT, FOOD_KCAL FROM FOOD
+        WHERE ID = %s AND DATE = %s AND FOOD_INDEX = %s FOR UPDATE
+    """, (user_id, food_date, food_index))
+    row = cursor.fetchone()
+    return tuple(to_number(value) for value in row) if row else None
+
+
+def on_food_insert(cursor, user_id, food_date, nutrition_info):
+    apply_food_delta(cursor, user_id, to_day(food_date), nutrition_values(nutrition_info), 1)
+
+
+def on_food_insert_many(cursor, user_id, food_date, nutrition_infos):
+    # 같은 날짜에 여러 음식을 한 번에 추가할 때 - 합계를 한 번만 갱신한다
+    delta = tuple(sum(values) for values in zip(*(nutrition_values(info) for info in nutrition_infos)))
+    apply_food_delta(cursor, user_id, to_day(food_date), delta, len(nutrition_infos))
+
+
+def on_food_update(cursor, user_id, food_date, food_index, nutrition_info):
+    # UPDATE 문을 실행하기 전에 호출해야 이전 값을 읽을 수 있다
+    lock_user(cursor, user_id)
+    old_values = select_food_values(cursor, user_id, food_date, food_index)
+    if old_values is None:
+        return
+    new_values = nutrition_values(nutrition_info)
+    delta = tuple(new - old for new, old in zip(new_values, old_values))
+    apply_food_delta(cursor, user_id, to_day(food_date), delta, 0)
+
+
+def on_food_delete(cursor, user_id, food_date, food_index):
+    # DELETE 문을 실행하기 전에 호출해야 지워질 값을 읽을 수 있다
+    lock_user(cursor, user_id)
+    old_values = select_food_values(cursor, user_id, food_date, food_index)
+    if old_values is None:
+        return
+    apply_food_delta(cursor, user_id, to_day(food_date), tuple(-value for value in old_values), -1)
+
+
+def rebuild_daily_totals(user_id, start, end):
+    # [start, end] 구간의 USER_NT 합계를 FOOD에서 다시 계산한다 (end 포함)
+    end_exclusive = end + timedelta(days=1)
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            # 다시 계산하는 동안 그 사용자의 FOOD 변경을 막는다 (없는 USER_NT 행을 추가하므로 갭 락 대신 USER 행 잠금)
+            lock_user(cursor, user_id)
+            cursor.execute("""
+                SELECT DATE(DATE) AS DAY, SUM(FOOD_CH), SUM(FOOD_PT), SUM(FOOD_FAT), SUM(FOOD_KCAL)
+                FROM FOOD
+                WHERE ID = %s AND DATE >= %s AND DATE < %s
+                GROUP BY DATE(DATE)
+            """, (user_id, start, end_exclusive))
+            sums = {to_day(row[0]): tuple(to_number(value) for value in row[1:]) for row in cursor.fetchall()}
+
+            cursor.execute("""
+                SELECT DATE FROM USER_NT WHERE ID = %s AND DATE >= %s AND DATE < %s FOR UPDATE
+            """, (user_id, start, end_exclusive))
+            existing = {to_day(row[0]) for row in cursor.fetchall()}
+
+            # 음식이 모두 지워진 날은 0으로 되돌린다
+            updates = [(*sums.get(day, (0, 0, 0, 0)), user_id, day) for day in existing]
+            if updates:
+                cursor.executemany("""
+                    UPDATE USER_NT SET CARBO = %s, PROTEIN = %s, FAT = %s, KCAL = %s
+                    WHERE ID = %s AND DATE = %s
+                """, updates)
+
+            recommended = latest_recommended(cursor, user_id)
+            inserts = [(user_id, day, *values, *recommended) for day, values in sums.items() if day not in existing]
+            if inserts:
+                cursor.executemany("""
+                    INSERT INTO USER_NT (ID, DATE, CARBO, PROTEIN, FAT, KCAL, RD_CARBO, RD_PROTEIN, RD_FAT)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, inserts)
+
+            # 다시 계산한 날은 모두 값이 바뀌었을 수 있으므로 캐시된 조회 응답을 무효화
+            data_version.bump_many(cursor, user_id, existing | set(sums))
+        connection.commit()
+        logging.info(f"Rebuilt USER_NT for {user_id}: {len(updates)} updated, {len(inserts)} inserted")
+    finally:
+        connection.close()
+
+    # 일별 합계가 바뀌었으므로 그 사용자의 월간 집계와 누적합도 다시 맞춘다
+    backfill_monthly(user_id)
+    prefix_index.rebuild(user_id)
+    return {"updated": len(updates), "inserted": len(inserts)}
+
+
+def backfill_monthly(user_id=None):
+    # FOOD / USER_NT 전체 기록에서 USER_NT_MONTHLY를 다시 만든다 (user_id가 없으면 모든 사용자)
+    user_filter = "WHERE ID = %s" if user_id else ""
+    params = (user_id,) if user_id else ()
+    rollup = {}
+
+    def entry(key):
+        if key not in rollup:
+            rollup[key] = [0, 0, 0.0, 0.0, 0.0, 0.0]
+        return rollup[key]
+
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT ID, YEAR(DATE), MONTH(DATE), COUNT(*), SUM(FOOD_KCAL)
+                FROM FOOD {user_filter}
+                GROUP BY ID, YEAR(DATE), MONTH(DATE)
+            """, params)
+            for food_user, year, month, item_count, kcal_sum in cursor.fetchall():
+                values = entry((food_user, year, month))
+                values[0] = item_count
+                values[2] = to_number(kcal_sum)
+
+        # 일별 백분율은 캘린더 응답과 똑같이 계산해야 하므로 USER_NT 행을 흘려 읽으며 더한다
+        with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(f"""
+                SELECT ID, DATE, CARBO, PROTEIN, FAT, KCAL, RD_CARBO, RD_PROTEIN, RD_FAT
+                FROM USER_NT {user_filter}
+            """, params)
+            for row in cursor:
+                day = to_day(row[1])
+                values = entry((row[0], day.year, day.month))
+                values[1] += 1
+                for i, percentage in enumerate(daily_percentages(row[2:])):
+                    values[3 + i] += percentage
+
+        with connection.cursor() as cursor:
+            # 버전이 다시 시작되므로 그 범위의 저장된 조언도 함께 지운다
+            cursor.execute(f"DELETE FROM ADVICE_CACHE {user_filter}", params)
+            cursor.execute(f"DELETE FROM USER_NT_MONTHLY {user_filter}", params)
+            if rollup:
+                cursor.executemany("""
+                    INSERT INTO USER_NT_MONTHLY
+                        (ID, YEAR, MONTH, ITEM_COUNT, DAY_COUNT, KCAL_SUM, CARBO_PCT_SUM, PROTEIN_PCT_SUM, FAT_PCT_SUM)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, [(*key, *values) for key, values in rollup.items()])
+        connection.commit()
+        logging.info(f"Backfilled USER_NT_MONTHLY: {len(rollup)} rows")
+        return len(rollup)
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) == 5 and sys.argv[1] == "rebuild":
+        rebuild_daily_totals(sys.argv[2], to_day(sys.argv[3]), to_day(sys.argv[4]))
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "backfill-monthly":
+        backfill_monthly(sys.argv[2] if len(sys.argv) == 3 else None)
+    else:
+        print("Usage: python aggregates.py rebuild USER_ID START_DATE END_DATE")
+        print("       python aggregates.py backfill-monthly [USER_ID]")
+        sys.exit(2)
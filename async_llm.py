@@ -0,0 +1,67 @@
+# async_llm.py
+# LangChain ainvoke 기반 비동기 LLM 클라이언트
+# - 세마포어로 동시에 진행 중인 호출 수를 제한하고, 호출마다 타임아웃을 건다 (세마포어 대기 시간 포함)
+# - async 코드에서는 ainvoke / abatch를 await 하고,
+#   Flask 같은 동기 코드에서는 invoke / batch / run을 호출한다.
+#   동기 호출은 하나의 백그라운드 이벤트 루프에서 실행되므로 한 워커에서
+#   수십 개의 LLM 호출을 동시에 진행시킬 수 있고, 동시 실행 제한도 프로세스 전체에 적용된다.
+
+import os
+import asyncio
+import threading
+import weakref
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))  # 동시에 진행할 최대 호출 수
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))                 # 호출 한 번의 최대 시간(초)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def background_loop():
+    # 동기 진입점이 공유하는 이벤트 루프 (데몬 스레드에서 계속 실행)
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-llm-loop", daemon=True).start()
+        return _loop
+
+
+def run(coro):
+    # 동기 코드에서 코루틴을 백그라운드 루프에 맡기고 결과를 기다린다
+    return asyncio.run_coroutine_threadsafe(coro, background_loop()).result()
+
+
+class AsyncLLMClient:
+    # runnable: ainvoke를 지원하는 LangChain Runnable (모델, 또는 prompt | model | parser 체인)
+    def __init__(self, runnable, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT):
+        self.runnable = runnable
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # asyncio.Semaphore는 이벤트 루프에 묶이므로 루프마다 따로 만든다
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def ainvoke(self, inputs, timeout=None):
+        # 세마포어 자리를 기다리는 시간도 timeout에 포함한다 - 호출이 몰려도 호출자의 시간 예산을 넘기지 않는다
+        async with asyncio.timeout(self.timeout if timeout is None else timeout):
+            async with self._semaphore():
+                return await self.runnable.ainvoke(inputs)
+
+    async def abatch(self, inputs_list, timeout=None, return_exceptions=False):
+        return await asyncio.gather(*(self.ainvoke(inputs, timeout) for inputs in inputs_list),
+                                    return_exceptions=return_exceptions)
+
+    def invoke(self, inputs, timeout=None):
+        return run(self.ainvoke(inputs, timeout))
+
+    def batch(self, inputs_list, timeout=None, return_exceptions=False):
+        return run(self.abatch(inputs_list, timeout, return_exceptions))
@@ -0,0 +1,91 @@
+# bench_food_record.py
+# 큰 달/분기 응답에서 행마다 dict를 만드는 방식과 FoodRecord(__slots__)를 비교
+# - 구조를 만드는 동안의 메모리 (tracemalloc 현재/최대)
+# - 구조 생성 시간과 JSON 직렬화 시간
+# DB 없이 FOOD 행 튜플을 만들어서 실행한다. 두 방식의 JSON 결과가 같은지도 확인한다.
+#
+# 사용법: python bench_food_record.py [하루 음식 수] [반복 횟수]
+
+import sys
+import time
+import random
+import tracemalloc
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+import food_record
+
+DAYS = 92  # 분기 (이전/현재/다음 달)
+
+
+def make_rows(per_day, seed=1):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 12, 0)
+    rows = []
+    for day in range(DAYS):
+        for index in range(per_day):
+            rows.append((start + timedelta(days=day), index + 1, f"음식{rng.randint(1, 500)}",
+                         Decimal(rng.randint(0, 600)) / 10, Decimal(rng.randint(0, 600)) / 10,
+                         Decimal(rng.randint(0, 1500)) / 10, Decimal(rng.randint(50, 1200))))
+    return rows
+
+
+def build_dicts(rows):
+    foods = [[] for _ in range(DAYS)]
+    start = rows[0][0]
+    for row in rows:
+        foods[(row[0] - start).days].append({
+            "food_index": row[1],
+            "food_name": row[2],
+            "protein": row[3],
+            "fat": row[4],
+            "carbohydrates": row[5],
+            "calories": row[6]
+        })
+    return foods
+
+
+def build_records(rows):
+    foods = [[] for _ in range(DAYS)]
+    start = rows[0][0]
+    for row in rows:
+        foods[(row[0] - start).days].append(food_record.FoodRecord.from_row(row))
+    return foods
+
+
+def measure(name, build, rows, provider, repeat):
+    tracemalloc.start()
+    foods = build(rows)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        build(rows)
+    build_ms = (time.perf_counter() - started) / repeat * 1000
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = provider.dumps({"foods": foods})
+    dump_ms = (time.perf_counter() - started) / repeat * 1000
+    return {"name": name, "rows": len(rows), "retained_kb": current / 1024, "peak_kb": peak / 1024,
+            "build_ms": build_ms, "dumps_ms": dump_ms}, body
+
+
+if __name__ == '__main__':
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = make_rows(per_day)
+    app = Flask(__name__)
+    app.json = food_record.JSONProvider(app)
+
+    dict_result, dict_body = measure("dict", build_dicts, rows, app.json, repeat)
+    record_result, record_body = measure("FoodRecord", build_records, rows, app.json, repeat)
+    assert dict_body == record_body, "JSON output differs"
+
+    columns = ["name", "rows", "retained_kb", "peak_kb", "build_ms", "dumps_ms"]
+    print(" | ".join(columns))
+    for result in (dict_result, record_result):
+        print(" | ".join(f"{result[c]:.1f}" if isinstance(result[c], float) else str(result[c]) for c in columns))
@@ -0,0 +1,72 @@
+# bench_hedging.py
+# 가짜 모델(fake_llm)로 헤지 요청의 꼬리 지연 개선을 오프라인에서 확인
+# 같은 지연 분포로 헤지 없이 / 헤지 사용 두 번 돌려서 p50/p90/p99와 추가 호출 비율을 비교한다.
+# 시간은 TIME_SCALE 배로 줄여서 실행하고, 출력은 원래 초 단위로 환산한다.
+#
+# 사용법: python bench_hedging.py [요청 수] [tail 비율]
+
+import sys
+import time
+import random
+import asyncio
+import statistics
+
+import async_llm
+import hedging
+from fake_llm import FakeChatModel, tail_latency
+
+TIME_SCALE = 0.01
+CONCURRENCY = 50
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(hedge, requests, tail_rate, seed=7):
+    model = FakeChatModel(latency=tail_latency(tail_rate=tail_rate, rng=random.Random(seed)), time_scale=TIME_SCALE)
+    client = async_llm.AsyncLLMClient(model, max_concurrency=CONCURRENCY * 2, timeout=60 * TIME_SCALE)
+    tracker = hedging.LatencyTracker(default_delay=hedging.LLM_HEDGE_DEFAULT_DELAY * TIME_SCALE,
+                                     min_delay=hedging.LLM_HEDGE_MIN_DELAY * TIME_SCALE)
+    hedged = hedging.HedgedClient(client, budget=hedging.LLM_DEADLINE * TIME_SCALE, enabled=hedge, tracker=tracker)
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                await hedged.ainvoke({"string": f"음식 {i}"})
+                latencies.append((time.monotonic() - started) / TIME_SCALE)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    stats = hedged.stats()
+    return {
+        "hedge": hedge,
+        "requests": requests,
+        "errors": errors,
+        "p50_s": statistics.median(latencies),
+        "p90_s": percentile(latencies, 90),
+        "p99_s": percentile(latencies, 99),
+        "max_s": max(latencies),
+        "extra_calls_pct": (model.calls - requests) / requests * 100,
+        "hedge_wins": stats["hedge_wins"],
+    }
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    tail_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    results = [asyncio.run(run(hedge, requests, tail_rate)) for hedge in (False, True)]
+
+    columns = ["hedge", "requests", "errors", "p50_s", "p90_s", "p99_s", "max_s", "extra_calls_pct", "hedge_wins"]
+    print(" | ".join(columns))
+    for result in results:
+        print(" | ".join(f"{result[c]:.2f}" if isinstance(result[c], float) else str(result[c]) for c in columns))
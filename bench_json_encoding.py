@@ -0,0 +1,64 @@
+# bench_json_encoding.py
+# 기록이 많은 사용자의 분기 응답(/api/food/quarterly)으로 JSON 인코더와 압축을 비교
+# - 직렬화 시간: Flask 기본(stdlib) vs fast_json(orjson)
+# - 응답 크기: 원본 / gzip / brotli(설치된 경우)와 압축 시간
+# 두 인코더의 결과가 같은 JSON 값인지도 확인한다.
+#
+# 사용법: python bench_json_encoding.py [하루 음식 수] [반복 횟수]
+
+import sys
+import json
+import time
+
+from flask import Flask
+
+import fast_json
+import food_record
+from bench_food_record import make_rows, build_records
+
+MONTH_DAYS = (31, 29, 32)  # make_rows의 92일을 세 달로 나눈다
+
+
+def quarterly_payload(rows):
+    foods = build_records(rows)
+    payload = {}
+    start = 0
+    for index, days in enumerate(MONTH_DAYS):
+        payload[f"2024-{index + 1:02d}"] = {
+            "foods": foods[start:start + days],
+            "percentages": [{"carbohydrates_percentage": 81.2, "protein_percentage": 95.5, "fat_percentage": 102.3}
+                            for _ in range(days)],
+        }
+        start += days
+    return payload
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+if __name__ == '__main__':
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    payload = quarterly_payload(make_rows(per_day))
+    app = Flask(__name__)
+    stdlib = food_record.JSONProvider(app)
+    fast = fast_json.JSONProvider(app)
+
+    stdlib_body, stdlib_ms = timed(lambda: stdlib.dumps(payload).encode("utf-8"), repeat)
+    fast_body, fast_ms = timed(lambda: fast.dumps_bytes(payload), repeat)
+    assert json.loads(stdlib_body) == json.loads(fast_body), "encoders disagree"
+
+    print(f"rows={sum(len(day) for month in payload.values() for day in month['foods'])} encoder={fast_json.ENCODER}")
+    print("encoder | dumps_ms | bytes")
+    print(f"stdlib | {stdlib_ms:.2f} | {len(stdlib_body)}")
+    print(f"fast_json | {fast_ms:.2f} | {len(fast_body)}")
+
+    print()
+    print("encoding | bytes | ratio | compress_ms")
+    for encoding in fast_json.available_encodings():
+        compressed, compress_ms = timed(lambda: fast_json.compress_body(fast_body, encoding), repeat)
+        print(f"{encoding} | {len(compressed)} | {len(compressed) / len(fast_body):.3f} | {compress_ms:.2f}")
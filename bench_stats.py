@@ -0,0 +1,157 @@
+# bench_stats.py
+# 여러 해 구간의 영양 통계: 기존 방식(날짜별 dict 리스트 + 파이썬 루프)과 stats.py(NumPy 열 배열)를 비교
+# - loop:  food_loader처럼 날짜별 음식/백분율 dict를 만든 뒤 advice.py의 예전 평균 루프를 구간 전체로 넓히고,
+#          같은 결과(중앙값, 백분위수, 7/30일 이동 평균, 목표 초과/미달 일수)를 파이썬으로 계산
+# - numpy: stats.load_columns가 만드는 것과 같은 열 배열을 만들고 stats.compute
+# DB 없이 (DATEDIFF, FOOD_KCAL) / USER_NT 행 튜플을 만들어서 실행하고, 두 결과가 같은지도 확인한다.
+#
+# 사용법: python bench_stats.py [년 수] [하루 음식 수] [반복 횟수]
+
+import sys
+import time
+import random
+from decimal import Decimal
+
+import numpy as np
+
+import stats
+from aggregates import to_number
+from food_loader import calc_percentages
+
+RDI = 2000.0
+
+
+def make_rows(years, per_day, seed=1):
+    # 기록이 없는 날(약 15%)도 섞는다
+    rng = random.Random(seed)
+    days = years * 365
+    food_rows, totals_rows = [], []
+    for day in range(days):
+        if rng.random() < 0.15:
+            continue
+        count = rng.randint(1, per_day * 2 - 1)
+        for _ in range(count):
+            food_rows.append((day, Decimal(rng.randint(50, 1200))))
+        totals_rows.append((day, Decimal(rng.randint(100, 4000)) / 10, Decimal(rng.randint(100, 1500)) / 10,
+                            Decimal(rng.randint(100, 1200)) / 10, Decimal(3000) / 10, Decimal(600) / 10, Decimal(650) / 10))
+    return days, food_rows, totals_rows
+
+
+def percentile(sorted_values, q):
+    # np.percentile 기본(linear)과 같은 보간
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def describe_loop(values, target):
+    result = {"days": len(values)}
+    ordered = sorted(values)
+    if ordered:
+        result["mean"] = round(sum(ordered) / len(ordered), 1)
+        result["median"] = round(percentile(ordered, 50), 1)
+        result["min"] = round(ordered[0], 1)
+        result["max"] = round(ordered[-1], 1)
+        for q in stats.STATS_PERCENTILES:
+            result[f"p{q}"] = round(percentile(ordered, q), 1)
+    over = under = 0
+    for value in values:
+        if value > target * (1 + stats.STATS_TARGET_TOLERANCE):
+            over += 1
+        elif value < target * (1 - stats.STATS_TARGET_TOLERANCE):
+            under += 1
+    result.update({"target": target, "days_over": over, "days_under": under, "days_on_target": len(values) - over - under})
+    return result
+
+
+def run_loop(days, food_rows, totals_rows):
+    # 날짜별 구조 만들기 (food_loader.load_months와 같은 모양)
+    foods = [[] for _ in range(days)]
+    percentages = [{} for _ in range(days)]
+    for offset, kcal in food_rows:
+        foods[offset].append({"calories": kcal})
+    for row in totals_rows:
+        percentages[row[0]] = calc_percentages(row[1:])
+
+    # 예전 get_avg_kcal / get_advice_route 루프를 구간 전체로
+    daily_kcal = []
+    total_kcal = 0
+    item_count = 0
+    for day_foods in foods:
+        day_kcal = 0
+        for food in day_foods:
+            day_kcal += to_number(food.get('calories', 0))
+            item_count += 1
+        total_kcal += day_kcal
+        daily_kcal.append(day_kcal if day_foods else None)
+
+    rolling = {}
+    for window in stats.ROLLING_WINDOWS:
+        values = []
+        for index in range(days):
+            recent = [value for value in daily_kcal[max(0, index - window + 1):index + 1] if value is not None]
+            values.append(round(sum(recent) / len(recent), 1) if recent else None)
+        rolling[window] = values
+
+    result = {
+        "item_count": item_count,
+        "average_kcal_per_item": round(total_kcal / item_count, 1),
+        "kcal": describe_loop([value for value in daily_kcal if value is not None], RDI),
+        "rolling": rolling,
+    }
+    for name in stats.MACROS:
+        values = [float(day_data[f"{name}_percentage"]) for day_data in percentages if day_data]
+        result[f"{name}_percentage"] = describe_loop(values, 100.0)
+    return result
+
+
+def build_columns(days, food_rows, totals_rows):
+    return {
+        "days": days,
+        "food_offset": np.fromiter((row[0] for row in food_rows), dtype=np.int64, count=len(food_rows)),
+        "food_kcal": np.fromiter((to_number(row[1]) for row in food_rows), dtype=np.float64, count=len(food_rows)),
+        "totals_offset": np.fromiter((row[0] for row in totals_rows), dtype=np.int64, count=len(totals_rows)),
+        "totals": np.fromiter((to_number(value) for row in totals_rows for value in row[1:]),
+                              dtype=np.float64, count=len(totals_rows) * 6).reshape(-1, 6),
+        "rdi": RDI,
+    }
+
+
+def run_numpy(days, food_rows, totals_rows):
+    return stats.compute(build_columns(days, food_rows, totals_rows))
+
+
+def check(loop_result, numpy_result):
+    # 반올림 경계에서 0.1 차이는 허용 (누적합/부동소수 순서 차이)
+    for key in ("item_count", "average_kcal_per_item"):
+        assert loop_result[key] == numpy_result[key], key
+    for key in ["kcal"] + [f"{name}_percentage" for name in stats.MACROS]:
+        for field, value in loop_result[key].items():
+            assert abs(value - numpy_result[key][field]) <= 0.11, (key, field, value, numpy_result[key][field])
+    for window in stats.ROLLING_WINDOWS:
+        for a, b in zip(loop_result["rolling"][window], numpy_result["daily"][f"kcal_rolling_{window}"]):
+            assert (a is None and b is None) or abs(a - b) <= 0.11, (window, a, b)
+
+
+def measure(run, data, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = run(*data)
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+if __name__ == '__main__':
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    data = make_rows(years, per_day)
+
+    loop_ms, loop_result = measure(run_loop, data, repeat)
+    numpy_ms, numpy_result = measure(run_numpy, data, repeat)
+    compute_ms, _ = measure(stats.compute, (build_columns(*data),), repeat)
+    check(loop_result, numpy_result)
+
+    print(f"{years} years, {len(data[1])} FOOD rows, {len(data[2])} USER_NT rows")
+    print(f"loop:  {loop_ms:.1f} ms")
+    print(f"numpy: {numpy_ms:.1f} ms  (x{loop_ms / numpy_ms:.1f}, of which compute {compute_ms:.1f} ms)")
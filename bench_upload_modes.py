@@ -0,0 +1,73 @@
+# bench_upload_modes.py
+# img/*.jpeg 샘플로 업로드 분석 방식(two_step / one_shot)의 지연 시간과 토큰 사용량 비교
+# 캐시를 거치지 않도록 upload_llm.ANALYZERS를 직접 호출한다. (실제 Azure 호출이 발생함)
+# 샘플 음식(피자, 햄버거, 김치)은 모두 로컬 영양 테이블(food_db)에 있으므로, 그대로 두면 two_step이
+# 모델을 한 번만 부른다. 두 번 호출하는 실제 파이프라인을 재도록 벤치마크 동안 food_db를 끈다.
+#
+# 사용법: python bench_upload_modes.py [반복 횟수]
+
+import os
+import sys
+import glob
+import time
+import statistics
+
+from langchain_community.callbacks import get_openai_callback
+
+import food_db
+import upload_llm
+
+IMG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "img")
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(mode, image_paths, repeat):
+    latencies = []
+    prompt_tokens = 0
+    completion_tokens = 0
+    calls = 0
+    errors = 0
+    for _ in range(repeat):
+        for image_path in image_paths:
+            with get_openai_callback() as cb:
+                started = time.perf_counter()
+                result = upload_llm.ANALYZERS[mode](image_path)
+                latencies.append(time.perf_counter() - started)
+            prompt_tokens += cb.prompt_tokens
+            completion_tokens += cb.completion_tokens
+            calls += cb.successful_requests
+            if "error" in result:
+                errors += 1
+            print(f"[{mode}] {os.path.basename(image_path)}: {result.get('food_name', result.get('error'))}")
+    samples = len(latencies)
+    return {
+        "mode": mode,
+        "samples": samples,
+        "errors": errors,
+        "p50_s": statistics.median(latencies),
+        "p90_s": percentile(latencies, 90),
+        "mean_s": statistics.mean(latencies),
+        "model_calls_per_image": calls / samples,
+        "prompt_tokens_per_image": prompt_tokens / samples,
+        "completion_tokens_per_image": completion_tokens / samples,
+    }
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    image_paths = sorted(glob.glob(os.path.join(IMG_DIR, "*.jpeg")))
+    food_db.NUTRITION_DB_ENABLED = False
+    results = [run(mode, image_paths, repeat) for mode in upload_llm.MODES]
+
+    print()
+    print(f"food_db: {'on' if food_db.NUTRITION_DB_ENABLED else 'off'}")
+    columns = ["mode", "samples", "errors", "p50_s", "p90_s", "mean_s",
+               "model_calls_per_image", "prompt_tokens_per_image", "completion_tokens_per_image"]
+    print(" | ".join(columns))
+    for result in results:
+        print(" | ".join(f"{result[c]:.2f}" if isinstance(result[c], float) else str(result[c]) for c in columns))
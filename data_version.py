@@ -0,0 +1,94 @@
+# data_version.py
+# 사용자/날짜별 데이터 버전과 조건부 조회(ETag / If-None-Match -> 304)
+# - FOOD/USER_NT를 바꾸는 쪽(aggregates.py)은 같은 cursor로 bump()를 호출해 그 날의 버전을 올린다.
+# - 조회 엔드포인트는 데이터를 읽기 전에 구간의 버전을 한 번 조회해 ETag를 만들고,
+#   클라이언트가 보낸 If-None-Match와 같으면 데이터를 읽지도 직렬화하지도 않고 304를 돌려준다.
+#   (데이터보다 버전을 먼저 읽으므로, 그 사이에 기록이 바뀌어도 다음 요청에서 새 ETag가 나온다)
+#
+# 사용법:
+#   etag = data_version.range_etag("quarterly", user_id, start, end)   # [start, end)
+#   etag = data_version.range_etag("calendar", user_id, start, end, user_columns=("BODY_WEIGHT", "HEIGHT"))
+#   if data_version.is_fresh(etag):
+#       return data_version.not_modified(etag)
+#   ...
+#   return data_version.with_etag(jsonify(data), etag)
+
+import os
+import hashlib
+import logging
+
+import pymysql
+from flask import request, Response
+
+import db_pool
+
+ETAG_ENABLED = os.getenv('ETAG_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ETAG_SALT = os.getenv('ETAG_SALT', '1')  # 응답 형식이 바뀌는 배포에서 올리면 기존 ETag가 모두 무효가 된다
+
+
+def bump(cursor, user_id, day):
+    cursor.execute("""
+        INSERT INTO USER_DATA_VERSION (ID, DATE, VERSION) VALUES (%s, %s, 1)
+        ON DUPLICATE KEY UPDATE VERSION = VERSION + 1
+    """, (user_id, day))
+
+
+def bump_many(cursor, user_id, days):
+    if days:
+        cursor.executemany("""
+            INSERT INTO USER_DATA_VERSION (ID, DATE, VERSION) VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE VERSION = VERSION + 1
+        """, [(user_id, day) for day in sorted(days)])
+
+
+def range_version(user_id, start, end, user_columns=()):
+    # (버전 합계, 행 수, USER 열 값...) - 조회 실패 시 None
+    # user_columns: 응답에 USER 행 값(체중, 키 등)이 들어가는 엔드포인트는 그 열도 함께 읽어 ETag에 넣는다
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT COALESCE(SUM(VERSION), 0), COUNT(*) FROM USER_DATA_VERSION
+                WHERE ID = %s AND DATE >= %s AND DATE < %s
+            """, (user_id, start, end))
+            total, count = cursor.fetchone()
+            user = ()
+            if user_columns:
+                cursor.execute(f"SELECT {', '.join(user_columns)} FROM USER WHERE ID = %s", (user_id,))
+                user = cursor.fetchone() or ()
+            return (int(total), int(count), *user)
+    except pymysql.MySQLError as e:
+        logging.error(f"Database error: {e}")
+        return None
+    finally:
+        connection.close()
+
+
+def range_etag(view, user_id, start, end, user_columns=()):
+    # view: 엔드포인트 이름 (같은 구간이라도 응답 형식이 다르면 ETag가 달라야 한다)
+    if not ETAG_ENABLED:
+        return None
+    version = range_version(user_id, start, end, user_columns)
+    if version is None:
+        return None
+    key = "|".join(str(value) for value in (ETAG_SALT, view, user_id, start, end, *version))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def is_fresh(etag):
+    # 압축 여부에 따라 본문 바이트가 달라지므로 약한 비교
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+
+def with_etag(response, etag):
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+        # 캐시는 하되 매번 서버에 확인하도록 (변경이 없으면 304)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified(etag):
+    response = with_etag(Response(status=304), etag)
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,254 @@
+# db_pool.py
+# 모든 엔드포인트 모듈이 공유하는 MySQL(pymysql) 커넥션 풀
+# pymysql.connect(**db_config) 대신 db_pool.get_connection()으로 빌려 쓰고,
+# 기존 코드처럼 connection.close()를 호출하면 실제로 끊지 않고 풀에 반납된다.
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+
+import pymysql
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# DB Connection
+db_config = {
+    'host': os.getenv('DB_HOST'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD'),
+    'database': os.getenv('DB_NAME')
+}
+
+# 풀 설정 (환경 변수로 조정)
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))                    # 동시에 열 수 있는 최대 커넥션 수
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))             # 빈 커넥션을 기다리는 최대 시간(초)
+POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')) # 이 시간 이상 놀고 있던 커넥션은 닫음
+POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))  # 생성 후 이 시간이 지나면 교체
+POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', '30'))  # 이 시간 이상 놀았으면 빌려주기 전에 ping
+
+
+class PoolTimeout(pymysql.err.OperationalError):
+    # 기존 핸들러들이 잡는 pymysql.MySQLError의 하위 클래스라서 그대로 500 응답으로 처리된다
+    pass
+
+
+class PooledConnection:
+    # 실제 pymysql 커넥션을 감싸서 close()를 풀 반납으로 바꿔준다
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw, self._created_at)
+
+    def discard(self):
+        # 결과를 끝까지 읽지 않은 스트리밍 조회(SSCursor) 등 - 풀에 돌려놓지 않고 실제로 끊는다
+        # (그냥 반납하면 다음 사용자가 남은 행을 모두 읽어 버려야 한다)
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw, self._created_at, reusable=False)
+
+    def __getattr__(self, name):
+        if self._released:
+            raise pymysql.err.InterfaceError(0, "Connection already returned to pool")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, config, size=POOL_SIZE, timeout=POOL_TIMEOUT, idle_timeout=POOL_IDLE_TIMEOUT,
+                 max_lifetime=POOL_MAX_LIFETIME, ping_interval=POOL_PING_INTERVAL):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (raw, created_at, returned_at) - 최근에 반납된 것이 오른쪽
+        self._open = 0        # 풀이 관리 중인 커넥션 수 (대기 + 대여 중)
+        self._metrics = {
+            "created": 0,
+            "borrowed": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "evicted_idle": 0,
+            "evicted_lifetime": 0,
+            "health_check_failures": 0,
+        }
+
+    def _connect(self):
+        raw = pymysql.connect(**self.config)
+        with self._lock:
+            self._metrics["created"] += 1
+        return raw, time.monotonic()
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _evict_expired_locked(self, now):
+        # 오래 놀았던 커넥션은 왼쪽에 모여 있으므로 왼쪽부터 정리
+        expired = []
+        while self._idle:
+            raw, created_at, returned_at = self._idle[0]
+            if now - returned_at > self.idle_timeout:
+                self._idle.popleft()
+                self._metrics["evicted_idle"] += 1
+            elif now - created_at > self.max_lifetime:
+                self._idle.popleft()
+                self._metrics["evicted_lifetime"] += 1
+            else:
+                break
+            self._open -= 1
+            expired.append(raw)
+        return expired
+
+    def _healthy(self, raw, created_at, returned_at, now):
+        if now - created_at > self.max_lifetime:
+            with self._lock:
+                self._metrics["evicted_lifetime"] += 1
+            return False
+        if now - returned_at < self.ping_interval:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except pymysql.MySQLError as e:
+            logging.warning(f"Pooled connection failed health check: {e}")
+            with self._lock:
+                self._metrics["health_check_failures"] += 1
+            return False
+
+    def get_connection(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                expired = self._evict_expired_locked(now)
+                candidate = None
+                create = False
+                while candidate is None and not create:
+                    if self._idle:
+                        candidate = self._idle.pop()  # 가장 최근에 반납된 것부터 재사용
+                    elif self._open < self.size:
+                        self._open += 1
+                        create = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._metrics["timeouts"] += 1
+                            break
+                        waited = True
+                        self._lock.wait(remaining)
+                if candidate is None and not create:
+                    self._record_wait(started, waited)
+            for raw in expired:
+                self._discard(raw)
+
+            if candidate is None and not create:
+                raise PoolTimeout(2013, f"Timed out after {self.timeout}s waiting for a database connection")
+
+            if create:
+                try:
+                    raw, created_at = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                        self._lock.notify()
+                    raise
+                return self._lend(raw, created_at, started, waited)
+
+            raw, created_at, returned_at = candidate
+            if self._healthy(raw, created_at, returned_at, time.monotonic()):
+                return self._lend(raw, created_at, started, waited)
+
+            # 상태가 나쁜 커넥션은 버리고 다시 시도
+            self._discard(raw)
+            with self._lock:
+                self._open -= 1
+                self._lock.notify()
+
+    def _record_wait(self, started, waited):
+        if not waited:
+            return
+        elapsed = time.monotonic() - started
+        self._metrics["waits"] += 1
+        self._metrics["wait_time_total"] += elapsed
+        self._metrics["wait_time_max"] = max(self._metrics["wait_time_max"], elapsed)
+
+    def _lend(self, raw, created_at, started, waited):
+        with self._lock:
+            self._metrics["borrowed"] += 1
+            self._record_wait(started, waited)
+        return PooledConnection(self, raw, created_at)
+
+    def _release(self, raw, created_at, reusable=True):
+        reusable = reusable and raw.open
+        if reusable:
+            try:
+                # 커밋되지 않은 트랜잭션이 다음 사용자에게 넘어가지 않도록 정리
+                raw.rollback()
+            except pymysql.MySQLError:
+                reusable = False
+
+        with self._lock:
+            if reusable:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+            self._lock.notify()
+
+        if not reusable:
+            self._discard(raw)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["size"] = self.size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+            stats["wait_time_avg"] = stats["wait_time_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+
+pool = ConnectionPool(db_config)
+
+
+def get_connection():
+    return pool.get_connection()
+
+
+def stats():
+    return pool.stats()
@@ -1,36 +1,20 @@
 from flask import Flask, request, jsonify
-import mysql.connector
-from mysql.connector import Error
+from pymysql import MySQLError as Error
+import db_pool
+import aggregates
 from dotenv import load_dotenv
-import os
 
 # 환경 변수 로드
 print("Loading .env file...")
 load_dotenv()
 
-db_host = os.getenv('DB_HOST')
-db_name = os.getenv('DB_NAME')
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASSWORD')
-
-# 환경 변수 확인을 위한 디버그 출력
-print(f"DB_HOST: {db_host}")
-print(f"DB_NAME: {db_name}")
-print(f"DB_USER: {db_user}")
-print(f"DB_PASS: {db_password}")
-
 app = Flask(__name__)
 
 # 데이터베이스 연결 설정
 def create_db_connection():
     try:
         print("Attempting to connect to the database...")
-        connection = mysql.connector.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
+        connection = db_pool.get_connection()
         print("Database connection successful!")
         return connection
     except Error as e:
@@ -53,6 +37,9 @@ def delete_food():
 
     try:
         cursor = connection.cursor()
+        # DELETE 전에 지워질 값을 읽어 USER_NT 일별 합계에서 빼기
+        aggregates.on_food_delete(cursor, user_id, date, food_index)
+
         delete_query = """
         DELETE FROM FOOD
         WHERE ID = %s AND DATE = %s AND FOOD_INDEX = %s
@@ -69,9 +56,8 @@ def delete_food():
         return jsonify({"error": str(e)}), 500
 
     finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+        cursor.close()
+        connection.close()
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -1,28 +1,24 @@
 #날짜에 따른 총섭취량, 개별 음식 영양성분 return
 from flask import Flask, request, jsonify
-import mysql.connector
-from mysql.connector import Error
+import pymysql
+from pymysql import MySQLError as Error
+import db_pool
+import food_record
+import fast_json
+import data_version
+import aggregates
+from datetime import timedelta
 from dotenv import load_dotenv
-import os
 
 #환경변수 load
 load_dotenv()
 app = Flask(__name__)
-
-db_host = os.getenv('DB_HOST')
-db_name = os.getenv('DB_NAME')
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASSWORD')
+app.json = fast_json.JSONProvider(app)
 
 # 데이터베이스 연결 설정
 def create_db_connection():
     try:
-        connection = mysql.connector.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
+        connection = db_pool.get_connection()
         return connection
     except Error as e:
         print(f"데이터베이스 연결 오류: {e}")
@@ -31,18 +27,32 @@ def create_db_connection():
 
 #REQUEST 객체에 ID, DATE 넘겨주세요
 @app.route('/api/calendar', methods=['GET'])
+@fast_json.compressed
 def get_calendar_data():
     user_id = request.args.get('ID')
     date = request.args.get('DATE')
+
+    # 그 날 기록과 체중/키가 바뀌지 않았으면 조회하지 않고 304 (DATE 형식이 이상하면 ETag 없이 기존대로)
+    etag = None
+    try:
+        day = aggregates.to_day(date)
+        etag = data_version.range_etag("calendar", user_id, day, day + timedelta(days=1),
+                                       user_columns=("BODY_WEIGHT", "HEIGHT"))
+    except ValueError:
+        pass
+    if data_version.is_fresh(etag):
+        return data_version.not_modified(etag)
+
     connection = create_db_connection()
 
     if connection is None:
         return jsonify({"error": "데이터베이스 연결 실패"}), 500
 
     try:
-        cursor = connection.cursor(dictionary=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
         query = """
-        SELECT un.DATE,un.CARBO, un.PROTEIN, un.FAT, un.KCAL,
+        SELECT u.ID, u.BODY_WEIGHT, u.HEIGHT,
+               un.DATE,un.CARBO, un.PROTEIN, un.FAT, un.KCAL,
                f.FOOD_INDEX, f.FOOD_NAME, f.FOOD_PT, f.FOOD_FAT, f.FOOD_CH
         FROM USER u
         JOIN USER_NT un ON u.ID = un.ID
@@ -73,23 +83,18 @@ def get_calendar_data():
 
         for row in results:
             if row['FOOD_INDEX'] is not None:
-                user_data['foods'].append({
-                    "food_index": row['FOOD_INDEX'],
-                    "food_name": row['FOOD_NAME'],
-                    "food_pt": row['FOOD_PT'],
-                    "food_fat": row['FOOD_FAT'],
-                    "food_ch": row['FOOD_CH']
-                })
+                user_data['foods'].append(food_record.DetailFoodRecord(
+                    row['DATE'], row['FOOD_INDEX'], row['FOOD_NAME'],
+                    row['FOOD_PT'], row['FOOD_FAT'], row['FOOD_CH'], None))
 
-        return jsonify(user_data), 200
+        return data_version.with_etag(jsonify(user_data), etag), 200
 
     except Error as e:
         return jsonify({"error": str(e)}), 500
 
     finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+        cursor.close()
+        connection.close()
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
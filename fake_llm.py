@@ -0,0 +1,53 @@
+# fake_llm.py
+# Azure 없이 지연 시간을 마음대로 줄 수 있는 가짜 채팅 모델 (벤치마크/오프라인 검증용)
+# LangChain Runnable이므로 실제 모델 자리에 그대로 넣을 수 있다.
+#   model = FakeChatModel(latency=tail_latency())          # 대부분 2초, 5%는 20~30초
+#   model = FakeChatModel(latency=lambda: 0.5, time_scale=0.01)
+
+import json
+import time
+import random
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+DEFAULT_CONTENT = json.dumps({"food_name": "돈까스", "calorie": "700", "carbohydrate": "45",
+                              "protein": "30", "fat": "40"}, ensure_ascii=False)
+
+
+def tail_latency(median=2.0, sigma=0.3, tail_rate=0.05, tail=(20.0, 30.0), rng=None):
+    # 대부분은 median 근처(로그정규), tail_rate 비율로 tail 구간의 아주 느린 응답
+    rng = rng or random.Random()
+
+    def sample():
+        if rng.random() < tail_rate:
+            return rng.uniform(*tail)
+        return rng.lognormvariate(0, sigma) * median
+    return sample
+
+
+class FakeChatModel(Runnable):
+    # latency: 호출마다 지연 시간(초)을 돌려주는 함수
+    # time_scale: 실제로 기다리는 시간 = latency() * time_scale (벤치마크를 빠르게 돌릴 때)
+    def __init__(self, latency=None, content=DEFAULT_CONTENT, time_scale=1.0):
+        self.latency = latency or (lambda: 0.0)
+        self.content = content
+        self.time_scale = time_scale
+        self.calls = 0
+
+    def _response(self):
+        return AIMessage(content=self.content)
+
+    def invoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency() * self.time_scale)
+        return self._response()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency() * self.time_scale)
+        return self._response()
+
+    def stream(self, input, config=None, **kwargs):
+        yield self.invoke(input, config, **kwargs)
@@ -0,0 +1,99 @@
+# fast_json.py
+# 캘린더/월간 응답용 JSON 인코더 + 압축
+# - orjson이 설치되어 있으면 orjson으로, 없으면 Flask 기본(stdlib json)으로 직렬화 (JSON_ENCODER로 고정 가능)
+#   Decimal -> 문자열, date/datetime -> HTTP 날짜 형식, 키 정렬 등 기존 jsonify 응답과 같은 값을 만든다
+# - @compressed 를 붙인 엔드포인트는 Accept-Encoding에 따라 br(brotli 설치 시) 또는 gzip으로 압축
+#
+# 사용법:
+#   app.json = fast_json.JSONProvider(app)
+#   @app.route(...)
+#   @fast_json.compressed
+#   def view(): ...
+
+import os
+import gzip
+import functools
+
+from flask import current_app, request
+
+import food_record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')                     # auto | orjson | stdlib
+JSON_COMPRESS_MIN_BYTES = int(os.getenv('JSON_COMPRESS_MIN_BYTES', '1024'))  # 이보다 작으면 압축하지 않음
+JSON_GZIP_LEVEL = int(os.getenv('JSON_GZIP_LEVEL', '6'))
+JSON_BROTLI_QUALITY = int(os.getenv('JSON_BROTLI_QUALITY', '5'))
+
+if JSON_ENCODER == 'stdlib' or orjson is None:
+    if JSON_ENCODER == 'orjson':
+        raise ImportError("JSON_ENCODER=orjson but orjson is not installed")
+    ENCODER = 'stdlib'
+else:
+    ENCODER = 'orjson'
+
+if orjson is not None:
+    # datetime/dataclass는 orjson 기본 형식(ISO) 대신 Flask와 같은 처리를 하도록 default로 넘긴다
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                      | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+
+class JSONProvider(food_record.JSONProvider):
+    def dumps_bytes(self, obj, indent=False):
+        if ENCODER == 'orjson':
+            options = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+            return orjson.dumps(obj, default=self.default, option=options)
+        return super().dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+    def dumps(self, obj, **kwargs):
+        if ENCODER == 'orjson' and not kwargs:
+            return self.dumps_bytes(obj).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if ENCODER != 'orjson':
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=JSON_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=JSON_GZIP_LEVEL)
+
+
+def compress_response(response):
+    if response.direct_passthrough or not 200 <= response.status_code < 300 \
+            or "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < JSON_COMPRESS_MIN_BYTES:
+        return response
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+    response.set_data(compress_body(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def compressed(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return compress_response(current_app.make_response(view(*args, **kwargs)))
+    return wrapper
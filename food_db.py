@@ -0,0 +1,169 @@
+# food_db.py
+# 자주 먹는 음식의 영양정보 참조 테이블 (data/korean_foods.csv) + 메모리 검색 인덱스
+# - 음식 이름/별칭을 글자 n-gram(+ kiwipiepy 형태소)으로 토큰화해서 BM25로 후보를 찾고
+# - 후보 이름과의 n-gram 유사도를 신뢰도로 사용한다
+# - "돈까스 2개 먹었어" 처럼 수량이 있으면 1회 제공량 기준 값에 곱한다
+# llm.do는 신뢰도가 NUTRITION_DB_MIN_CONFIDENCE 이상이면 LLM을 호출하지 않고 이 값을 쓴다.
+#
+# 사용법: python food_db.py "돈까스 2개 먹었어"
+
+import os
+import re
+import csv
+import sys
+import threading
+
+from rank_bm25 import BM25Okapi
+
+import nutrition_cache
+
+try:
+    from kiwipiepy import Kiwi  # 설치되어 있으면 형태소(명사) 토큰도 함께 사용
+except ImportError:
+    Kiwi = None
+
+NUTRITION_DB_PATH = os.getenv('NUTRITION_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                "data", "korean_foods.csv"))
+NUTRITION_DB_ENABLED = os.getenv('NUTRITION_DB_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+NUTRITION_DB_MIN_CONFIDENCE = float(os.getenv('NUTRITION_DB_MIN_CONFIDENCE', '0.8'))
+
+NUTRIENTS = ("calorie", "carbohydrate", "protein", "fat")
+CANDIDATES = 5                    # BM25로 뽑는 후보 수
+UNIT_MISMATCH_PENALTY = 0.5       # 테이블에 없는 단위(예: 김밥 1그릇)는 신뢰도를 깎아서 LLM에 넘긴다
+QUANTITY = re.compile(rf"(\d+(?:\.\d+)?)({nutrition_cache.COUNTERS})")
+
+
+def ngrams(text, n=2):
+    # 앞뒤 경계 표시를 붙인 글자 n-gram - 한 글자 음식 이름(밥, 떡)도 토큰이 생긴다
+    text = f"^{text}$"
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+def similarity(a, b):
+    # 글자 bigram 집합의 Dice 계수 (0~1)
+    if a == b:
+        return 1.0
+    grams_a, grams_b = set(ngrams(a)), set(ngrams(b))
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def parse_quantity(text):
+    # "돈까스 2개 먹었어" -> ("돈까스", 2.0, "개"), 수량이 없으면 (이름, 1.0, None)
+    text = nutrition_cache.normalize_quantity_text(text)
+    quantity, unit = 1.0, None
+    match = QUANTITY.search(text)
+    if match:
+        quantity, unit = float(match.group(1)), match.group(2)
+        text = text[:match.start()] + text[match.end():]
+    return "".join(text.split()), quantity, unit
+
+
+def format_number(value):
+    value = round(value, 1)
+    return str(int(value)) if value == int(value) else str(value)
+
+
+class FoodIndex:
+    def __init__(self, rows):
+        self.rows = rows
+        self.kiwi = Kiwi() if Kiwi else None
+        # 이름과 별칭을 각각 하나의 문서로 색인 (문서 번호 -> (행 번호, 이름))
+        self.documents = [(row_index, name)
+                          for row_index, row in enumerate(rows)
+                          for name in [row["name"]] + row["aliases"]]
+        self.bm25 = BM25Okapi([self.tokenize(name) for _, name in self.documents])
+
+    def tokenize(self, text):
+        tokens = ngrams(text)
+        if self.kiwi:
+            tokens += [token.form for token in self.kiwi.tokenize(text) if token.tag.startswith("NN")]
+        return tokens
+
+    def search(self, name, limit=CANDIDATES):
+        # [(행, 신뢰도)] 신뢰도 높은 순
+        if not name:
+            return []
+        scores = self.bm25.get_scores(self.tokenize(name))
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        best = {}
+        for document_index in ranked[:max(limit, CANDIDATES) * 2]:
+            if scores[document_index] <= 0:
+                break
+            row_index, document_name = self.documents[document_index]
+            confidence = similarity(name, document_name)
+            best[row_index] = max(best.get(row_index, 0.0), confidence)
+        results = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.rows[row_index], confidence) for row_index, confidence in results]
+
+    def lookup(self, text):
+        # 입력 문장 -> (영양정보 dict, 신뢰도), 후보가 없으면 (None, 0.0)
+        name, quantity, unit = parse_quantity(text)
+        results = self.search(name, limit=1)
+        if not results:
+            return None, 0.0
+        row, confidence = results[0]
+        servings = quantity
+        if unit is not None:
+            if unit in row["units"]:
+                servings = quantity * row["units"][unit]
+            else:
+                confidence *= UNIT_MISMATCH_PENALTY
+        nutrition_info = {key: format_number(row[key] * servings) for key in NUTRIENTS}
+        return nutrition_info, confidence
+
+
+def load_foods(path=NUTRITION_DB_PATH):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            units = {}
+            for item in filter(None, record["units"].split("|")):
+                unit, servings = item.split("=")
+                units[unit] = float(servings)
+            row = {
+                "name": record["name"],
+                "aliases": [alias for alias in record["aliases"].split("|") if alias and alias != record["name"]],
+                "serving": record["serving"],
+                "units": units,
+            }
+            for key in NUTRIENTS:
+                row[key] = float(record[key])
+            rows.append(row)
+    return rows
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    # 처음 조회할 때 한 번만 CSV를 읽어 인덱스를 만든다
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FoodIndex(load_foods())
+        return _index
+
+
+def lookup(text, min_confidence=None):
+    # 신뢰도가 기준 이상일 때만 영양정보를 반환, 아니면 None (-> LLM 호출)
+    if not NUTRITION_DB_ENABLED:
+        return None
+    if min_confidence is None:
+        min_confidence = NUTRITION_DB_MIN_CONFIDENCE
+    nutrition_info, confidence = get_index().lookup(text)
+    if nutrition_info is None or confidence < min_confidence:
+        return None
+    return nutrition_info
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python food_db.py "돈까스 2개 먹었어"')
+        sys.exit(2)
+    index = get_index()
+    name, quantity, unit = parse_quantity(sys.argv[1])
+    print(f"name={name} quantity={quantity} unit={unit}")
+    for row, confidence in index.search(name):
+        print(f"  {confidence:.2f} {row['name']} ({row['serving']})")
+    print(index.lookup(sys.argv[1]))
@@ -0,0 +1,163 @@
+# food_loader.py
+# 캘린더 화면용 FOOD / USER_NT 데이터를 한 번에 읽어오는 로더
+# 날짜마다 USER_NT를 따로 조회하던 방식(N+1) 대신, 한 커넥션에서
+# FOOD 범위 1번 + USER_NT 범위 1번, 고정된 2개의 쿼리로 한 달 또는 분기를 만든다.
+# 1년 이상의 긴 구간(history)은 stream_days로 HISTORY_CHUNK_DAYS일씩 읽어 하루씩 흘려보낸다.
+
+import os
+import pymysql
+import db_pool
+import food_record
+import logging
+import calendar
+from itertools import groupby
+from datetime import date, datetime, timedelta
+
+HISTORY_CHUNK_DAYS = int(os.getenv('HISTORY_CHUNK_DAYS', '31'))  # stream_days가 커넥션 한 번에 읽는 일수
+
+
+def calc_percentages(daily_totals):
+    carb_total, protein_total, fat_total, rd_carb, rd_protein, rd_fat = daily_totals
+    return {
+        "carbohydrates_percentage": round((carb_total / rd_carb) * 100, 1) if rd_carb > 0 else 0,
+        "protein_percentage": round((protein_total / rd_protein) * 100, 1) if rd_protein > 0 else 0,
+        "fat_percentage": round((fat_total / rd_fat) * 100, 1) if rd_fat > 0 else 0
+    }
+
+
+def month_range(year, month):
+    # [해당 월 1일, 다음 달 1일) 반개구간
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def month_key(year, month):
+    return f"{year}-{str(month).zfill(2)}"
+
+
+def quarter_months(year, start_month):
+    # 이전 달, 현재 달, 다음 달 순서 (연도가 바뀌는 경우 포함)
+    months = []
+    for i in range(-1, 2):
+        month = (start_month + i - 1) % 12 + 1
+        current_year = year + (start_month + i - 1) // 12
+        months.append((current_year, month))
+    return months
+
+
+def months_range(months):
+    # 연속된 (year, month) 목록 전체를 덮는 [start, end) 구간
+    return month_range(*months[0])[0], month_range(*months[-1])[1]
+
+
+def load_months(months, user_id, empty_percentages):
+    # months: 연속된 (year, month) 목록. 전체 구간을 FOOD 1번, USER_NT 1번으로 읽어서
+    # 월별 {"foods": [...], "percentages": [...]} 구조로 나눈다.
+    # empty_percentages: USER_NT 행이 없는 날에 채울 기본값 (호출하는 모듈마다 다름)
+    start, end = months_range(months)
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = """
+                SELECT DATE, FOOD_INDEX, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL
+                FROM FOOD
+                WHERE ID = %s AND DATE >= %s AND DATE < %s
+                ORDER BY DATE
+            """
+            cursor.execute(sql, (user_id, start, end))
+            food_rows = cursor.fetchall()
+
+            sql = """
+                SELECT DATE, CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT
+                FROM USER_NT
+                WHERE ID = %s AND DATE >= %s AND DATE < %s
+            """
+            cursor.execute(sql, (user_id, start, end))
+            totals_rows = cursor.fetchall()
+    except pymysql.MySQLError as e:
+        logging.error(f"Database error: {e}")
+        return {month_key(year, month): {"error": "Database error"} for year, month in months}
+    finally:
+        connection.close()
+
+    result = {}
+    for year, month in months:
+        num_days = calendar.monthrange(year, month)[1]  # 해당 월의 일수 계산
+        result[(year, month)] = {
+            "foods": [[] for _ in range(num_days)],  # 각 날짜별 음식 리스트
+            "percentages": [dict(empty_percentages) for _ in range(num_days)]  # 각 날짜별 백분율 리스트
+        }
+
+    for row in food_rows:
+        day = row[0].day - 1  # 0-based index for lists
+        result[(row[0].year, row[0].month)]["foods"][day].append(food_record.FoodRecord.from_row(row))
+
+    # Add daily percentages
+    for row in totals_rows:
+        result[(row[0].year, row[0].month)]["percentages"][row[0].day - 1] = calc_percentages(row[1:])
+
+    return {month_key(year, month): data for (year, month), data in result.items()}
+
+
+def load_month(year, month, user_id, empty_percentages):
+    data = load_months([(year, month)], user_id, empty_percentages)
+    return data[month_key(year, month)]
+
+
+def day_of(value):
+    # FOOD.DATE에는 날짜와 datetime이 섞여 있으므로 날짜 단위로 맞춘다
+    return value.date() if isinstance(value, datetime) else value
+
+
+def merge_days(food_days, total_days, empty_percentages):
+    # 날짜 순으로 정렬된 (day, foods) / (day, percentages) 두 흐름을 날짜 기준으로 병합
+    food = next(food_days, None)
+    total = next(total_days, None)
+    while food is not None or total is not None:
+        day = min(item[0] for item in (food, total) if item is not None)
+        foods, percentages = [], dict(empty_percentages)
+        if food is not None and food[0] == day:
+            foods = food[1]
+            food = next(food_days, None)
+        if total is not None and total[0] == day:
+            percentages = total[1]
+            total = next(total_days, None)
+        yield day, foods, percentages
+
+
+def stream_days(user_id, start, end, empty_percentages):
+    # [start, end) 구간을 날짜 순서로 하루씩 (day, foods, percentages)로 내보낸다 (기록이 있는 날만)
+    # HISTORY_CHUNK_DAYS일씩 끊어서 읽는다: 조각마다 커넥션을 잠깐 빌려 FOOD 1번, USER_NT 1번 읽고
+    # 바로 반납한 뒤 그 조각의 날들을 보낸다. 클라이언트가 천천히 받아도 커넥션을 붙잡고 있지 않고,
+    # 메모리도 조각 하나 크기로 일정하다.
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + timedelta(days=HISTORY_CHUNK_DAYS), end)
+        connection = db_pool.get_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT DATE, FOOD_INDEX, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL
+                    FROM FOOD
+                    WHERE ID = %s AND DATE >= %s AND DATE < %s
+                    ORDER BY DATE, FOOD_INDEX
+                """, (user_id, chunk_start, chunk_end))
+                food_rows = cursor.fetchall()
+                cursor.execute("""
+                    SELECT DATE, CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT
+                    FROM USER_NT
+                    WHERE ID = %s AND DATE >= %s AND DATE < %s
+                    ORDER BY DATE
+                """, (user_id, chunk_start, chunk_end))
+                totals_rows = cursor.fetchall()
+        finally:
+            connection.close()
+
+        food_days = (
+            (day, [food_record.FoodRecord.from_row(row) for row in rows])
+            for day, rows in groupby(food_rows, key=lambda row: day_of(row[0]))
+        )
+        total_days = ((day_of(row[0]), calc_percentages(row[1:])) for row in totals_rows)
+        yield from merge_days(food_days, total_days, empty_percentages)
+        chunk_start = chunk_end
@@ -0,0 +1,84 @@
+# food_record.py
+# FOOD 한 행을 담는 공용 레코드
+# 행마다 dict를 만드는 대신 __slots__ 객체 하나만 만들고,
+# JSON으로 내보낼 때 화면별 키 이름(SHAPE)으로 바로 쓴다.
+#   FoodRecord       -> 캘린더/월간/일간 화면: food_index, food_name, protein, fat, carbohydrates, calories
+#   DetailFoodRecord -> detail.py: food_index, food_name, food_pt, food_fat, food_ch
+# Flask 앱에서 app.json = food_record.JSONProvider(app) 로 설정하면 jsonify가 레코드를 그대로 처리한다.
+
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+# (JSON 키, 속성 이름)
+CALENDAR_SHAPE = (
+    ("food_index", "food_index"),
+    ("food_name", "food_name"),
+    ("protein", "protein"),
+    ("fat", "fat"),
+    ("carbohydrates", "carbohydrates"),
+    ("calories", "calories"),
+)
+DETAIL_SHAPE = (
+    ("food_index", "food_index"),
+    ("food_name", "food_name"),
+    ("food_pt", "protein"),
+    ("food_fat", "fat"),
+    ("food_ch", "carbohydrates"),
+)
+
+
+class FoodRecord:
+    __slots__ = ("date", "food_index", "food_name", "protein", "fat", "carbohydrates", "calories")
+    SHAPE = CALENDAR_SHAPE
+
+    def __init__(self, date, food_index, food_name, protein, fat, carbohydrates, calories):
+        self.date = date
+        self.food_index = food_index
+        self.food_name = food_name
+        self.protein = protein
+        self.fat = fat
+        self.carbohydrates = carbohydrates
+        self.calories = calories
+
+    @classmethod
+    def from_row(cls, row):
+        # row: (DATE, FOOD_INDEX, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL) 순서의 튜플
+        return cls(*row)
+
+    def to_json(self):
+        return dict(zip(self._keys, self._values(self)))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in FoodRecord.__slots__)})"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._prepare()
+
+    @classmethod
+    def _prepare(cls):
+        # 키 튜플과 값 getter를 클래스마다 한 번만 만든다
+        cls._keys = tuple(key for key, _ in cls.SHAPE)
+        cls._values = attrgetter(*(name for _, name in cls.SHAPE))
+
+
+FoodRecord._prepare()
+
+
+class DetailFoodRecord(FoodRecord):
+    __slots__ = ()
+    SHAPE = DETAIL_SHAPE
+
+
+def serialize(records):
+    return [record.to_json() for record in records]
+
+
+class JSONProvider(DefaultJSONProvider):
+    # 기본 Flask JSON 처리 + FoodRecord
+    @staticmethod
+    def default(o):
+        if isinstance(o, FoodRecord):
+            return o.to_json()
+        return DefaultJSONProvider.default(o)
@@ -1,26 +1,24 @@
 from flask import Flask, request, jsonify
 import pymysql
-import os
+import db_pool
+import food_record
+import fast_json
+import data_version
 from dotenv import load_dotenv
 import logging
+import calendar
+from datetime import date, timedelta
 
 load_dotenv()
 
 app = Flask(__name__)
-
-# DB Connection
-db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
-}
+app.json = fast_json.JSONProvider(app)
 
 # Logger 설정
 logging.basicConfig(level=logging.DEBUG)
 
 def get_user_nutritional_needs(user_id):
-    connection = pymysql.connect(**db_config)
+    connection = db_pool.get_connection()
     try:
         with connection.cursor() as cursor:
             sql = "SELECT BODY_WEIGHT, RDI FROM USER WHERE ID = %s"
@@ -37,52 +35,39 @@ def get_user_nutritional_needs(user_id):
     finally:
         connection.close()
 
-def get_daily_totals(user_id, date):
-    connection = pymysql.connect(**db_config)
-    try:
-        with connection.cursor() as cursor:
-            sql = "SELECT CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT FROM USER_NT WHERE ID = %s AND DATE = %s"
-            cursor.execute(sql, (user_id, date))
-            result = cursor.fetchone()
-            if result:
-                return result
-            else:
-                return None
-    except pymysql.MySQLError as e:
-        logging.error(f"Database error: {e}")
+def get_daily_totals(cursor, user_id, date):
+    # get_foods_by_date와 같은 커넥션/커서로 조회 (커넥션을 두 개 빌리면 풀이 가득 찼을 때 서로 기다리다 타임아웃)
+    sql = "SELECT CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT FROM USER_NT WHERE ID = %s AND DATE = %s"
+    cursor.execute(sql, (user_id, date))
+    result = cursor.fetchone()
+    if result:
+        return result
+    else:
         return None
-    finally:
-        connection.close()
 
 def get_foods_by_date(year, month, day, user_id):
-    connection = pymysql.connect(**db_config)
+    connection = db_pool.get_connection()
     try:
         with connection.cursor() as cursor:
             sql = """
                 SELECT DATE, FOOD_INDEX, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL
                 FROM FOOD
-                WHERE YEAR(DATE) = %s AND MONTH(DATE) = %s AND DAY(DATE) = %s AND ID = %s
+                WHERE ID = %s AND DATE >= %s AND DATE < %s
                 ORDER BY DATE
             """
-            cursor.execute(sql, (year, month, day, user_id))
+            # [해당 날짜, 다음 날) 반개구간 - DATE 컬럼에 함수를 씌우지 않아야 인덱스를 탄다
+            start = date(year, month, day)
+            cursor.execute(sql, (user_id, start, start + timedelta(days=1)))
             results = cursor.fetchall()
             foods_list = []  # 특정 날짜의 음식 리스트
             percentages = {"carbohydrates_percentage": 0, "protein_percentage": 0, "fat_percentage": 0}  # 기본값 0으로 설정
 
             for row in results:
-                food_info = {
-                    "food_index": row[1],
-                    "food_name": row[2],
-                    "protein": row[3],
-                    "fat": row[4],
-                    "carbohydrates": row[5],
-                    "calories": row[6]
-                }
-                foods_list.append(food_info)
+                foods_list.append(food_record.FoodRecord.from_row(row))
 
             # Add daily percentages
             date_str = f"{year}-{str(month).zfill(2)}-{str(day).zfill(2)}"  # 날짜 문자열
-            daily_totals = get_daily_totals(user_id, date_str)
+            daily_totals = get_daily_totals(cursor, user_id, date_str)
             if daily_totals:
                 carb_total, protein_total, fat_total, rd_carb, rd_protein, rd_fat = daily_totals
                 percentages = {
@@ -102,6 +87,7 @@ def get_foods_by_date(year, month, day, user_id):
         connection.close()
 
 @app.route('/api/food/get_day', methods=['GET'])
+@fast_json.compressed
 def get_day_food():
     year = request.args.get('year')
     month = request.args.get('month')
@@ -115,18 +101,24 @@ def get_day_food():
         year = int(year)
         month = int(month)
         day = int(day)
-        if month < 1 or month > 12 or day < 1 or day > 31:
+        if month < 1 or month > 12 or day < 1 or day > calendar.monthrange(year, month)[1]:
             return jsonify({"error": "Invalid month or day. Please enter valid values."}), 400
     except ValueError:
         return jsonify({"error": "Year, month, and day must be integers."}), 400
 
+    # 그 날 기록이 바뀌지 않았으면 데이터를 읽지 않고 304
+    start = date(year, month, day)
+    etag = data_version.range_etag("get_day", user_id, start, start + timedelta(days=1))
+    if data_version.is_fresh(etag):
+        return data_version.not_modified(etag)
+
     daily_data = get_foods_by_date(year, month, day, user_id)
 
     if "error" in daily_data:
         logging.error(f"Failed to get daily data: {daily_data['error']}")
         return jsonify(daily_data), 500
 
-    return jsonify(daily_data)
+    return data_version.with_etag(jsonify(daily_data), etag)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)  # 다른 포트로 실행하여 send.py와 충돌 방지
\ No newline at end of file
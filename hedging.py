@@ -0,0 +1,123 @@
+# hedging.py
+# 마감 시간(budget)이 있는 LLM 호출 + 느린 호출에 대한 헤지(hedged request)
+# 1. 첫 호출을 보낸다
+# 2. 최근 성공한 호출 지연 시간의 LLM_HEDGE_PERCENTILE 백분위까지 응답이 없으면 같은 요청을 한 번 더 보낸다
+# 3. 먼저 성공한 응답을 쓰고 나머지는 취소한다
+# 4. budget이 지나면 모두 취소하고 TimeoutError
+# 헤지 호출도 게이트웨이를 거치므로 동시 호출 제한/서킷 브레이커가 그대로 적용된다.
+# budget은 호출 시점부터 잰다 - 각 시도에 남은 시간을 넘기고, AsyncLLMClient가 동시 실행 자리를 기다리는 시간도 거기에 포함한다.
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+import async_llm
+
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '25'))                      # 요청 하나의 전체 시간 예산(초)
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))      # 이 백분위를 넘기면 헤지
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))      # 이보다 적으면 기본 지연 사용
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '8'))
+LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', '1'))
+LLM_HEDGE_MAX = int(os.getenv('LLM_HEDGE_MAX', '1'))                        # 추가로 보낼 최대 호출 수
+LATENCY_WINDOW = 512
+
+
+class LatencyTracker:
+    # 최근 성공한 호출의 지연 시간으로 헤지 시점을 정한다
+    def __init__(self, window=LATENCY_WINDOW, percentile=LLM_HEDGE_PERCENTILE, min_samples=LLM_HEDGE_MIN_SAMPLES,
+                 default_delay=LLM_HEDGE_DEFAULT_DELAY, min_delay=LLM_HEDGE_MIN_DELAY):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self):
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(len(samples) - 1, int(round(self.percentile / 100 * (len(samples) - 1))))
+        return max(self.min_delay, samples[index])
+
+
+class HedgedClient:
+    # client: AsyncLLMClient (ainvoke(inputs, timeout))
+    def __init__(self, client, budget=LLM_DEADLINE, max_hedges=LLM_HEDGE_MAX, enabled=LLM_HEDGE_ENABLED, tracker=None):
+        self.client = client
+        self.budget = budget
+        self.max_hedges = max_hedges
+        self.enabled = enabled
+        self.tracker = tracker or LatencyTracker()
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "timeouts": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    async def ainvoke(self, inputs, budget=None):
+        self._count("calls")
+        started = time.monotonic()
+        deadline = started + (budget or self.budget)
+        tasks = {}  # task -> 시도 번호 (0 = 첫 호출)
+
+        def launch():
+            remaining = deadline - time.monotonic()
+            tasks[asyncio.ensure_future(self.client.ainvoke(inputs, remaining))] = len(tasks)
+
+        launch()
+        last_error = None
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                pending = [task for task in tasks if not task.done()]
+                if remaining <= 0:
+                    self._count("timeouts")
+                    raise asyncio.TimeoutError(f"LLM call exceeded its {budget or self.budget:.1f}s budget")
+
+                can_hedge = self.enabled and len(tasks) <= self.max_hedges
+                wait = min(remaining, max(0.0, started + self.tracker.hedge_delay() * len(tasks) - time.monotonic())) \
+                    if can_hedge else remaining
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task.exception() is None:
+                        attempt = tasks[task]
+                        if attempt > 0:
+                            self._count("hedge_wins")
+                        self.tracker.record(time.monotonic() - started)
+                        return task.result()
+                    last_error = task.exception()
+                    logging.warning(f"LLM attempt {tasks[task]} failed: {last_error!r}")
+
+                if not any(not task.done() for task in tasks):
+                    # 모든 시도가 실패 (재시도는 게이트웨이가 이미 했음)
+                    raise last_error
+                if not done and can_hedge and time.monotonic() < deadline:
+                    # 헤지 시점까지 응답이 없음 - 같은 요청을 한 번 더
+                    self._count("hedged")
+                    launch()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def invoke(self, inputs, budget=None):
+        # 동기 코드용 - 백그라운드 이벤트 루프에서 실행
+        return async_llm.run(self.ainvoke(inputs, budget))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["hedge_delay"] = round(self.tracker.hedge_delay(), 3)
+        return stats
@@ -0,0 +1,62 @@
+# image_pipeline.py
+# 업로드 이미지를 디스크를 거치지 않고 메모리에서 처리하는 파이프라인
+# 1. multipart 파일을 임시 파일 대신 메모리 버퍼로 받는다 (InMemoryRequest)
+# 2. 읽으면서 SHA-256을 계산한다 (read_upload)
+# 3. 비전 모델에 맞는 크기로 줄이고, 이미 적당한 JPEG이면 다시 인코딩하지 않는다 (prepare_image)
+# 4. 버퍼에서 바로 base64로 인코딩한다 (to_base64)
+
+import os
+import base64
+import hashlib
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from flask import Request
+
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(16 * 1024 * 1024)))  # 요청 본문 최대 크기
+VISION_MAX_EDGE = int(os.getenv('VISION_MAX_EDGE', '1024'))                     # 긴 변 최대 픽셀
+VISION_JPEG_QUALITY = int(os.getenv('VISION_JPEG_QUALITY', '85'))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+EXIF_ORIENTATION = 0x0112
+
+
+class InMemoryRequest(Request):
+    # werkzeug는 500KB가 넘는 업로드를 임시 파일로 내리는데, 크기는 MAX_CONTENT_LENGTH로
+    # 제한하고 있으므로 항상 메모리 버퍼로 받는다
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return BytesIO()
+
+
+def read_upload(file_storage):
+    # 업로드 스트림을 청크 단위로 읽으면서 해시 계산 -> (바이트, SHA-256 hex)
+    digest = hashlib.sha256()
+    buffer = BytesIO()
+    for chunk in iter(lambda: file_storage.stream.read(UPLOAD_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        buffer.write(chunk)
+    return buffer.getvalue(), digest.hexdigest()
+
+
+def prepare_image(data, max_edge=VISION_MAX_EDGE, quality=VISION_JPEG_QUALITY):
+    # 비전 모델에 보낼 JPEG 바이트를 만든다
+    with Image.open(BytesIO(data)) as image:
+        upright = image.getexif().get(EXIF_ORIENTATION, 1) == 1
+        if image.format == "JPEG" and max(image.size) <= max_edge and upright:
+            # 이미 충분히 작은 JPEG은 원본 그대로 사용 (디코딩/재인코딩 없음)
+            return data
+
+        if image.format == "JPEG":
+            # JPEG은 디코딩 단계에서 1/2, 1/4, 1/8로 줄여 읽을 수 있어서 큰 사진이 훨씬 빠르다
+            image.draft("RGB", (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        buffered = BytesIO()
+        image.save(buffered, format="JPEG", quality=quality)
+        return buffered.getvalue()
+
+
+def to_base64(data):
+    return base64.b64encode(data).decode("utf-8")
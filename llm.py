@@ -6,14 +6,24 @@ from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.output_parsers import JsonOutputParser
 from dotenv import load_dotenv
 import os
+import logging
+import asyncio
+import nutrition_cache
+import food_db
+import async_llm
+import singleflight
+import hedging
+import llm_gateway
 
 
 load_dotenv()
 
-model = AzureChatOpenAI(
+# 동시 호출 제한/재시도/서킷 브레이커는 게이트웨이가 담당하므로 SDK 재시도는 끈다
+model = llm_gateway.GatewayChatModel(AzureChatOpenAI(
     azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),  # gpt-4o is set by env
     temperature=1.0,
-)
+    max_retries=0,
+))
 
 
 class NutritionInfo(BaseModel):
@@ -38,13 +48,105 @@ prompt_template = ChatPromptTemplate.from_template(
     """
 ).partial(format_instructions=output_parser.get_format_instructions())
 
+# 같은 음식(정규화된 이름)의 분석 결과 캐시 - 프롬프트나 배포 모델이 바뀌면 버전이 바뀐다
+cache = nutrition_cache.TwoTierCache(
+    "text",
+    version=nutrition_cache.prompt_version(prompt_template.invoke({"string": ""}).to_string(),
+                                           os.getenv("AZURE_OPENAI_DEPLOYMENT")),
+    key_func=nutrition_cache.normalize_food_name,
+)
 
-def do(param):
-    print(f"Received input: {param}")  # Debugging 출력 추가
-    prompt_value = prompt_template.invoke({"string": param})
-    model_output = model.invoke(prompt_value)
-    output = output_parser.invoke(model_output)
-    output_dict = output  # 이미 딕셔너리 형태로 반환됨
+# 비동기 클라이언트 (동시 호출 수 제한 + 호출별 타임아웃)
+async_client = async_llm.AsyncLLMClient(prompt_template | model | output_parser)
+# 요청별 마감 시간 + 느린 호출 헤지 (동기/비동기 경로 모두 사용)
+hedged_client = hedging.HedgedClient(async_client)
+
+# 같은 음식(정규화된 이름)의 분석이 진행 중이면 그 결과를 함께 기다린다
+flight = singleflight.Group("text")
+
+
+def from_cache(param, cached):
+    output_dict = dict(cached)
+    output_dict["food_name"] = param  # 음식 이름을 추가
+    logging.debug(f"Cached output: {output_dict}")
+    return output_dict
+
+
+def to_cache(param, output_dict):
+    cache.set(param, {key: value for key, value in output_dict.items() if key != "food_name"})
+
+
+def from_food_db(param):
+    # 참조 테이블에서 충분히 확실하게 찾으면 LLM을 호출하지 않는다
+    nutrition_info = food_db.lookup(param)
+    if nutrition_info is None:
+        return None
+    nutrition_info["food_name"] = param  # 음식 이름을 추가
+    logging.debug(f"Food DB output: {nutrition_info}")
+    return nutrition_info
+
+
+def flight_key(param):
+    return cache.key(param) or param
+
+
+def lookup(param):
+    # 캐시 -> LLM 순서로 조회하고 (캐시된 결과인지, food_name 없는 결과)를 반환
+    cached = cache.get(param)
+    if cached is not None:
+        return True, cached
+
+    output = hedged_client.invoke({"string": param})
+    to_cache(param, output)
+    return False, output
+
+
+async def alookup(param, timeout=None):
+    cached = await asyncio.to_thread(cache.get, param)
+    if cached is not None:
+        return True, cached
+
+    # timeout: 이 요청의 시간 예산 (없으면 LLM_DEADLINE)
+    output = await hedged_client.ainvoke({"string": param}, timeout)
+    await asyncio.to_thread(to_cache, param, output)
+    return False, output
+
+
+def with_food_name(param, was_cached, output):
+    # 같은 결과를 여러 요청이 공유하므로 복사해서 각자의 입력을 food_name으로 붙인다
+    if was_cached:
+        return from_cache(param, output)
+    output_dict = dict(output)
     output_dict["food_name"] = param  # 음식 이름을 추가
     print(f"Parsed output: {output_dict}")  # Debugging 출력 추가
     return output_dict
+
+
+def do(param):
+    logging.debug(f"Received input: {param}")
+    local = from_food_db(param)
+    if local is not None:
+        return local
+
+    was_cached, output = flight.do(flight_key(param), lambda: lookup(param))
+    return with_food_name(param, was_cached, output)
+
+
+async def ado(param, timeout=None):
+    # do의 비동기 버전 - 캐시 조회/저장은 DB를 쓰므로 스레드에서 실행
+    logging.debug(f"Received input: {param}")
+    local = from_food_db(param)
+    if local is not None:
+        return local
+
+    was_cached, output = await flight.ado(flight_key(param), lambda: alookup(param, timeout), timeout)
+    return with_food_name(param, was_cached, output)
+
+
+async def ado_many(params, timeout=None):
+    return await asyncio.gather(*(ado(param, timeout) for param in params))
+
+
+def do_many(params, timeout=None):
+    # 여러 음식을 동시에 분석 (동기 코드용)
+    return async_llm.run(ado_many(params, timeout))
@@ -0,0 +1,552 @@
+# llm_gateway.py
+# 모든 Azure OpenAI 호출이 거쳐 가는 공용 게이트웨이
+# - 동시 호출 수 제한: 프로세스 전체(LLM_GLOBAL_CONCURRENCY) + 배포(deployment)별
+# - 토큰 버킷: 배포별 분당 요청 수(RPM) / 분당 토큰 수(TPM)
+# - 429, 5xx, 타임아웃은 지터가 들어간 지수 백오프로 재시도 (Retry-After 헤더가 있으면 따른다)
+# - 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 동안 바로 실패시켜 워커가 묶이지 않게 한다
+# - 엔드포인트(Flask request.endpoint)별 대기 시간 통계
+#
+# 모델은 GatewayChatModel로 감싸서 쓴다. LangChain Runnable이므로 prompt | model | parser 체인에 그대로 들어간다.
+#   model = llm_gateway.GatewayChatModel(AzureChatOpenAI(..., max_retries=0))
+# 재시도는 게이트웨이가 하므로 SDK 자체 재시도는 끈다(max_retries=0).
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+
+import openai
+from flask import jsonify, request, has_request_context
+from langchain_core.runnables import Runnable
+
+LLM_GLOBAL_CONCURRENCY = int(os.getenv('LLM_GLOBAL_CONCURRENCY', '32'))
+LLM_DEPLOYMENT_CONCURRENCY = int(os.getenv('LLM_DEPLOYMENT_CONCURRENCY', '16'))
+LLM_RPM = int(os.getenv('LLM_RPM', '0'))  # 배포별 분당 요청 수 (0이면 제한 없음)
+LLM_TPM = int(os.getenv('LLM_TPM', '0'))  # 배포별 분당 토큰 수 (0이면 제한 없음)
+# 배포별로 다르게 줄 때: "gpt-4o=8:60:150000,gpt-4o-mini=16" (동시 호출:RPM:TPM)
+LLM_DEPLOYMENT_LIMITS = os.getenv('LLM_DEPLOYMENT_LIMITS', '')
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '10'))  # 자리를 기다리는 최대 시간(초)
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_RETRY_BASE = float(os.getenv('LLM_RETRY_BASE', '0.5'))
+LLM_RETRY_MAX = float(os.getenv('LLM_RETRY_MAX', '8'))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))     # 연속 실패 횟수
+LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))    # 열린 상태 유지 시간(초)
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv('LLM_EXPECTED_OUTPUT_TOKENS', '500'))
+
+CHARS_PER_TOKEN = 2   # 한국어 프롬프트 기준 대략적인 값
+IMAGE_TOKENS = 800    # 이미지 한 장의 대략적인 토큰 수
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+METRIC_SAMPLES = 1024
+
+
+class LLMUnavailable(Exception):
+    pass
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class QueueTimeout(LLMUnavailable):
+    pass
+
+
+class Slots:
+    # 스레드와 asyncio 코루틴이 함께 쓰는 세마포어 (먼저 기다린 쪽이 먼저 받는다)
+    def __init__(self, size):
+        self.size = size
+        self.available = size
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    def acquire(self, timeout):
+        with self._lock:
+            if self.available > 0 and not self._waiters:
+                self.available -= 1
+                return True
+            event = threading.Event()
+            self._waiters.append(event)
+        if event.wait(max(timeout, 0)):
+            return True
+        with self._lock:
+            if event in self._waiters:
+                self._waiters.remove(event)
+                return False
+        # 시간 초과 직전에 자리를 넘겨받은 경우
+        return True
+
+    async def aacquire(self, timeout):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.available > 0 and not self._waiters:
+                self.available -= 1
+                return True
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max(timeout, 0))
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                waiting = (loop, future) in self._waiters
+                if waiting:
+                    self._waiters.remove((loop, future))
+            if not waiting:
+                # 이미 자리를 넘겨받았으면 되돌려 준다
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self.available += 1
+                return
+            waiter = self._waiters.popleft()
+        # 기다리던 쪽에 자리를 바로 넘긴다
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(_grant, future)
+
+    def in_use(self):
+        with self._lock:
+            return self.size - self.available
+
+
+def _grant(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class TokenBucket:
+    # 분당 rate만큼 채워지는 버킷. reserve()는 미리 차감하고 기다려야 하는 시간을 돌려준다.
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class CircuitBreaker:
+    # closed -> (연속 실패 threshold회) -> open -> (cooldown 후) half_open: 시험 호출 1개만 허용
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self, name):
+        with self._lock:
+            if self.state == "open":
+                remaining = self.cooldown - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpen(f"LLM deployment {name} is unavailable, retry in {remaining:.0f}s")
+                self.state = "half_open"
+                self.probing = False
+            if self.state == "half_open":
+                if self.probing:
+                    raise CircuitOpen(f"LLM deployment {name} is recovering")
+                self.probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logging.warning(f"LLM circuit opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def record_abandoned(self):
+        # 결과를 모르고 끝난 호출 (취소 등) - 시험 호출 자리만 풀어 준다
+        with self._lock:
+            self.probing = False
+
+    def is_open(self):
+        return self.state == "open"
+
+
+class Deployment:
+    def __init__(self, name, concurrency, rpm, tpm):
+        self.name = name
+        self.slots = Slots(concurrency)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.breaker = CircuitBreaker()
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _get(self, endpoint):
+        item = self._endpoints.get(endpoint)
+        if item is None:
+            item = {"calls": 0, "retries": 0, "errors": 0, "rejected": 0, "circuit_open": 0,
+                    "queue_time_sum": 0.0, "queue_time_max": 0.0, "samples": deque(maxlen=METRIC_SAMPLES)}
+            self._endpoints[endpoint] = item
+        return item
+
+    def queued(self, endpoint, seconds):
+        with self._lock:
+            item = self._get(endpoint)
+            item["calls"] += 1
+            item["queue_time_sum"] += seconds
+            item["queue_time_max"] = max(item["queue_time_max"], seconds)
+            item["samples"].append(seconds)
+
+    def count(self, endpoint, name):
+        with self._lock:
+            self._get(endpoint)[name] += 1
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for endpoint, item in self._endpoints.items():
+                samples = sorted(item["samples"])
+                result[endpoint] = {
+                    "calls": item["calls"],
+                    "retries": item["retries"],
+                    "errors": item["errors"],
+                    "rejected": item["rejected"],
+                    "circuit_open": item["circuit_open"],
+                    "queue_ms_avg": round(item["queue_time_sum"] / item["calls"] * 1000, 1) if item["calls"] else 0.0,
+                    "queue_ms_p50": round(percentile(samples, 50) * 1000, 1),
+                    "queue_ms_p95": round(percentile(samples, 95) * 1000, 1),
+                    "queue_ms_max": round(item["queue_time_max"] * 1000, 1),
+                }
+            return result
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def endpoint_name():
+    # Flask 요청 안이면 엔드포인트 이름, 아니면 background (업로드 작업 워커 등)
+    if has_request_context():
+        return request.endpoint or request.path
+    return "background"
+
+
+def estimate_tokens(value):
+    # 요청 전 토큰 버킷에서 미리 차감할 대략적인 입력 토큰 수
+    if isinstance(value, str):
+        return len(value) // CHARS_PER_TOKEN + 1
+    if isinstance(value, dict):
+        if value.get("type") == "image_url":
+            return IMAGE_TOKENS
+        return sum(estimate_tokens(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(item) for item in value)
+    if hasattr(value, "to_messages"):
+        return estimate_tokens(value.to_messages())
+    if hasattr(value, "content"):
+        return estimate_tokens(value.content)
+    return 0
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                          openai.InternalServerError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS
+
+
+def retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_limits(text):
+    # "gpt-4o=8:60:150000,gpt-4o-mini=16" -> {"gpt-4o": (8, 60, 150000), "gpt-4o-mini": (16, LLM_RPM, LLM_TPM)}
+    limits = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, values = item.split("=")
+        values = values.split(":")
+        defaults = [LLM_DEPLOYMENT_CONCURRENCY, LLM_RPM, LLM_TPM]
+        limits[name] = tuple(int(values[i]) if i < len(values) and values[i] else defaults[i] for i in range(3))
+    return limits
+
+
+class Lease:
+    def __init__(self, deployment, estimate):
+        self.deployment = deployment
+        self.estimate = estimate
+
+
+class Gateway:
+    def __init__(self, global_concurrency=LLM_GLOBAL_CONCURRENCY, limits=None, queue_timeout=LLM_QUEUE_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, retry_base=LLM_RETRY_BASE, retry_max=LLM_RETRY_MAX):
+        self.slots = Slots(global_concurrency)
+        self.limits = parse_limits(LLM_DEPLOYMENT_LIMITS) if limits is None else limits
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.metrics = Metrics()
+        self._deployments = {}
+        self._lock = threading.Lock()
+
+    def deployment(self, name):
+        with self._lock:
+            deployment = self._deployments.get(name)
+            if deployment is None:
+                concurrency, rpm, tpm = self.limits.get(name, (LLM_DEPLOYMENT_CONCURRENCY, LLM_RPM, LLM_TPM))
+                deployment = Deployment(name, concurrency, rpm, tpm)
+                self._deployments[name] = deployment
+            return deployment
+
+    # --- 자리 확보 / 반납 ---
+
+    def _reserve(self, deployment, endpoint, estimate):
+        try:
+            deployment.breaker.before_call(deployment.name)
+        except CircuitOpen:
+            self.metrics.count(endpoint, "circuit_open")
+            raise
+        wait = max(deployment.requests.reserve(1), deployment.tokens.reserve(estimate))
+        if wait > self.queue_timeout:
+            self._reject(deployment, endpoint, estimate)
+        return wait
+
+    def _abandon(self, deployment, estimate, held=()):
+        # 자리 확보를 끝내지 못함 - 이미 잡은 자리를 돌려주고 미리 차감한 요청/토큰을 되돌린다
+        # half-open 시험 호출이었으면 그 자리도 풀어 줘야 다음 호출이 시험할 수 있다
+        for slots in held:
+            slots.release()
+        deployment.requests.refund(1)
+        deployment.tokens.refund(estimate)
+        deployment.breaker.record_abandoned()
+
+    def _reject(self, deployment, endpoint, estimate, held=()):
+        self._abandon(deployment, estimate, held)
+        self.metrics.count(endpoint, "rejected")
+        raise QueueTimeout(f"LLM deployment {deployment.name} is busy, try again later")
+
+    def _admit(self, deployment, endpoint, estimate):
+        started = time.monotonic()
+        wait = self._reserve(deployment, endpoint, estimate)
+        needed = (deployment.slots, self.slots)
+        held = []
+        try:
+            time.sleep(wait)
+            for slots in needed:
+                if not slots.acquire(self.queue_timeout - (time.monotonic() - started)):
+                    break
+                held.append(slots)
+        except BaseException:
+            self._abandon(deployment, estimate, held)
+            raise
+        if len(held) < len(needed):
+            self._reject(deployment, endpoint, estimate, held)
+        self.metrics.queued(endpoint, time.monotonic() - started)
+        return Lease(deployment, estimate)
+
+    async def _aadmit(self, deployment, endpoint, estimate):
+        # 기다리는 중에 취소되면(호출자 timeout, 헤지 취소) CancelledError가 나오므로 그때도 되돌린다
+        started = time.monotonic()
+        wait = self._reserve(deployment, endpoint, estimate)
+        needed = (deployment.slots, self.slots)
+        held = []
+        try:
+            await asyncio.sleep(wait)
+            for slots in needed:
+                if not await slots.aacquire(self.queue_timeout - (time.monotonic() - started)):
+                    break
+                held.append(slots)
+        except BaseException:
+            self._abandon(deployment, estimate, held)
+            raise
+        if len(held) < len(needed):
+            self._reject(deployment, endpoint, estimate, held)
+        self.metrics.queued(endpoint, time.monotonic() - started)
+        return Lease(deployment, estimate)
+
+    def _release(self, lease):
+        self.slots.release()
+        lease.deployment.slots.release()
+
+    def _succeeded(self, lease, result):
+        self._release(lease)
+        lease.deployment.breaker.record_success()
+        # 실제 사용량을 알면 미리 차감한 토큰과의 차이를 정산
+        usage = getattr(result, "usage_metadata", None)
+        if usage and usage.get("total_tokens"):
+            lease.deployment.tokens.refund(lease.estimate - usage["total_tokens"])
+
+    def _failed(self, lease, endpoint, error, attempt):
+        # 재시도할 경우 기다릴 시간, 재시도하지 않으면 None
+        self._release(lease)
+        breaker = lease.deployment.breaker
+        if not isinstance(error, Exception):
+            breaker.record_abandoned()
+            return None
+        if not is_retryable(error):
+            # 서비스는 응답했으므로(400 등) 브레이커에는 성공으로 센다
+            breaker.record_success()
+            self.metrics.count(endpoint, "errors")
+            return None
+        breaker.record_failure()
+        if attempt >= self.max_retries or breaker.is_open():
+            self.metrics.count(endpoint, "errors")
+            return None
+        self.metrics.count(endpoint, "retries")
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        after = retry_after(error)
+        if after is not None:
+            delay = min(self.retry_max, after) + delay / 2
+        logging.warning(f"LLM call failed ({type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    # --- 호출 ---
+
+    def call(self, name, func, estimate=0):
+        deployment = self.deployment(name)
+        endpoint = endpoint_name()
+        attempt = 0
+        while True:
+            lease = self._admit(deployment, endpoint, estimate)
+            try:
+                result = func()
+            except BaseException as e:
+                delay = self._failed(lease, endpoint, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._succeeded(lease, result)
+            return result
+
+    async def acall(self, name, coro_func, estimate=0):
+        deployment = self.deployment(name)
+        endpoint = endpoint_name()
+        attempt = 0
+        while True:
+            lease = await self._aadmit(deployment, endpoint, estimate)
+            try:
+                result = await coro_func()
+            except BaseException as e:
+                delay = self._failed(lease, endpoint, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._succeeded(lease, result)
+            return result
+
+    def stream(self, name, iter_func, estimate=0):
+        # 첫 조각을 받기 전에 실패한 경우에만 재시도 (이미 보낸 내용은 되돌릴 수 없음)
+        deployment = self.deployment(name)
+        endpoint = endpoint_name()
+        attempt = 0
+        while True:
+            lease = self._admit(deployment, endpoint, estimate)
+            started = False
+            try:
+                for chunk in iter_func():
+                    started = True
+                    yield chunk
+            except BaseException as e:
+                delay = self._failed(lease, endpoint, e, attempt)
+                if delay is None or started:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._succeeded(lease, None)
+            return
+
+    def stats(self):
+        with self._lock:
+            deployments = {
+                name: {
+                    "in_flight": deployment.slots.in_use(),
+                    "concurrency": deployment.slots.size,
+                    "circuit": deployment.breaker.state,
+                    "consecutive_failures": deployment.breaker.failures,
+                }
+                for name, deployment in self._deployments.items()
+            }
+        return {"in_flight": self.slots.in_use(), "concurrency": self.slots.size,
+                "deployments": deployments, "endpoints": self.metrics.stats()}
+
+
+gateway = Gateway()
+
+
+class GatewayChatModel(Runnable):
+    # 채팅 모델을 감싸서 invoke / ainvoke / stream 호출이 게이트웨이를 거치게 한다
+    def __init__(self, model, deployment=None, gateway=None):
+        self.model = model
+        self.deployment = deployment or os.getenv("AZURE_OPENAI_DEPLOYMENT") or "default"
+        self.gateway = gateway or globals()["gateway"]
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.gateway.call(self.deployment, lambda: self.model.invoke(input, config, **kwargs),
+                                 estimate_tokens(input) + LLM_EXPECTED_OUTPUT_TOKENS)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self.gateway.acall(self.deployment, lambda: self.model.ainvoke(input, config, **kwargs),
+                                        estimate_tokens(input) + LLM_EXPECTED_OUTPUT_TOKENS)
+
+    def stream(self, input, config=None, **kwargs):
+        return self.gateway.stream(self.deployment, lambda: self.model.stream(input, config, **kwargs),
+                                   estimate_tokens(input) + LLM_EXPECTED_OUTPUT_TOKENS)
+
+
+def init_app(app):
+    # LLM을 쓰는 Flask 앱에 통계 엔드포인트와 503 응답을 붙인다
+    @app.errorhandler(LLMUnavailable)
+    def llm_unavailable(e):
+        return jsonify({"error": str(e)}), 503
+
+    @app.route('/api/llm/stats', methods=['GET'])
+    def llm_stats():
+        return jsonify(gateway.stats())
@@ -1,7 +1,8 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import mysql.connector
-from mysql.connector import Error
+import pymysql
+from pymysql import MySQLError as Error
+import db_pool
 from dotenv import load_dotenv
 import os
 
@@ -18,12 +19,7 @@ print(f"Environment variables loaded. DB_HOST: {os.getenv('DB_HOST')}")  # 디
 def create_db_connection():
     print("Attempting to create database connection")  # 디버깅 메시지
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            database=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD')
-        )
+        connection = db_pool.get_connection()
         print("Database connection successful")  # 디버깅 메시지
         return connection
     except Error as e:
@@ -42,7 +38,7 @@ def login():
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
-        cursor = connection.cursor(dictionary=True)
+        cursor = connection.cursor(pymysql.cursors.DictCursor)
         query = "SELECT * FROM USER WHERE ID = %s AND PASSWORD = %s"
         print(f"Executing query: {query}")  # 디버깅 메시지
         cursor.execute(query, (data['id'], data['password']))
@@ -60,10 +56,9 @@ def login():
         print(f"Database error occurred: {str(e)}")  # 디버깅 메시지
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-            print("Database connection closed")  # 디버깅 메시지
+        cursor.close()
+        connection.close()
+        print("Database connection closed")  # 디버깅 메시지
 
 def insert_test_data():
     print("Inserting test data...")  # 디버깅 메시지
@@ -111,10 +106,9 @@ def insert_test_data():
     except Error as e:
         print(f"An error occurred: {str(e)}")  # 디버깅 메시지
     finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-            print("Database connection closed")  # 디버깅 메시지
+        cursor.close()
+        connection.close()
+        print("Database connection closed")  # 디버깅 메시지
 
 if __name__ == '__main__':
     print("Starting Flask application")  # 디버깅 메시지
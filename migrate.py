@@ -0,0 +1,171 @@
+# migrate.py
+# 버전 관리되는 스키마 마이그레이션 실행기
+# migrations/NNNN_이름.sql 파일을 번호 순서대로 한 번씩만 적용하고,
+# 적용한 버전은 SCHEMA_MIGRATIONS 테이블에 기록한다.
+#
+# 사용법:
+#   python migrate.py            # 아직 적용되지 않은 마이그레이션 적용
+#   python migrate.py status     # 적용 여부 출력
+#   python migrate.py explain    # 주요 조회 쿼리가 인덱스를 타는지 EXPLAIN으로 확인
+
+import os
+import re
+import sys
+import logging
+from datetime import date
+
+import pymysql
+import db_pool
+
+logging.basicConfig(level=logging.INFO)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# EXPLAIN 확인 대상: (설명, 쿼리, 파라미터, 사용되어야 하는 인덱스 후보)
+EXPLAIN_CHECKS = [
+    (
+        "FOOD month/quarter range (food_loader)",
+        """
+        SELECT DATE, FOOD_INDEX, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL
+        FROM FOOD
+        WHERE ID = %s AND DATE >= %s AND DATE < %s
+        ORDER BY DATE
+        """,
+        ("__explain__", date(2024, 1, 1), date(2024, 4, 1)),
+        {"IDX_FOOD_ID_DATE_INDEX"},
+    ),
+    (
+        "FOOD max index (add_food)",
+        "SELECT MAX(FOOD_INDEX) FROM FOOD WHERE ID = %s AND DATE = %s",
+        ("__explain__", date(2024, 1, 1)),
+        {"IDX_FOOD_ID_DATE_INDEX"},
+    ),
+    (
+        "USER_NT range (food_loader)",
+        """
+        SELECT DATE, CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT
+        FROM USER_NT
+        WHERE ID = %s AND DATE >= %s AND DATE < %s
+        """,
+        ("__explain__", date(2024, 1, 1), date(2024, 4, 1)),
+        {"UQ_USER_NT_ID_DATE", "IDX_USER_NT_ID_DATE"},
+    ),
+    (
+        "USER_DATA_VERSION range (ETag)",
+        """
+        SELECT COALESCE(SUM(VERSION), 0), COUNT(*) FROM USER_DATA_VERSION
+        WHERE ID = %s AND DATE >= %s AND DATE < %s
+        """,
+        ("__explain__", date(2024, 1, 1), date(2024, 4, 1)),
+        {"PRIMARY"},
+    ),
+    (
+        "USER_NT_PREFIX cumulative before date (range_summary)",
+        """
+        SELECT KCAL_CUM, CARBO_CUM, PROTEIN_CUM, FAT_CUM, ITEM_CUM, DAY_CUM FROM USER_NT_PREFIX
+        WHERE ID = %s AND DATE < %s
+        ORDER BY DATE DESC LIMIT 1
+        """,
+        ("__explain__", date(2024, 4, 1)),
+        {"PRIMARY"},
+    ),
+    (
+        "USER lookup",
+        "SELECT BODY_WEIGHT, RDI FROM USER WHERE ID = %s",
+        ("__explain__",),
+        {"IDX_USER_ID", "PRIMARY"},
+    ),
+]
+
+
+def list_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.match(r"^(\d+)_.*\.sql$", filename)
+        if match:
+            migrations.append((match.group(1), filename))
+    return migrations
+
+
+def split_statements(sql_text):
+    lines = [line for line in sql_text.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SCHEMA_MIGRATIONS (
+            VERSION VARCHAR(32) NOT NULL PRIMARY KEY,
+            NAME VARCHAR(255) NOT NULL,
+            APPLIED_AT DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    cursor.execute("SELECT VERSION FROM SCHEMA_MIGRATIONS")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate():
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            ensure_migrations_table(cursor)
+            applied = applied_versions(cursor)
+            for version, filename in list_migrations():
+                if version in applied:
+                    continue
+                logging.info(f"Applying migration {filename}")
+                with open(os.path.join(MIGRATIONS_DIR, filename), encoding="utf-8") as f:
+                    statements = split_statements(f.read())
+                # MySQL의 DDL은 자동 커밋되므로 파일 단위로 적용 후 바로 기록한다
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute("INSERT INTO SCHEMA_MIGRATIONS (VERSION, NAME) VALUES (%s, %s)", (version, filename))
+                connection.commit()
+        logging.info("Migrations are up to date")
+    finally:
+        connection.close()
+
+
+def status():
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            ensure_migrations_table(cursor)
+            applied = applied_versions(cursor)
+        for version, filename in list_migrations():
+            print(f"{'applied' if version in applied else 'pending':8} {filename}")
+    finally:
+        connection.close()
+
+
+def explain():
+    ok = True
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            for description, sql, params, expected_keys in EXPLAIN_CHECKS:
+                cursor.execute("EXPLAIN " + sql, params)
+                plan = cursor.fetchall()
+                used_key = plan[0].get("key") if plan else None
+                passed = used_key in expected_keys
+                ok = ok and passed
+                print(f"{'OK' if passed else 'FAIL':4} {description}: key={used_key} expected={sorted(expected_keys)}")
+    finally:
+        connection.close()
+    return ok
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command == "migrate":
+        migrate()
+    elif command == "status":
+        status()
+    elif command == "explain":
+        sys.exit(0 if explain() else 1)
+    else:
+        print(f"Unknown command: {command} (use migrate, status or explain)")
+        sys.exit(2)
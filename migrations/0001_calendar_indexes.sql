@@ -0,0 +1,9 @@
+-- 캘린더/조회 쿼리용 복합 인덱스
+-- FOOD: ID + DATE 범위 조회, 같은 날짜의 FOOD_INDEX 정렬과 MAX(FOOD_INDEX) 계산
+CREATE INDEX IDX_FOOD_ID_DATE_INDEX ON FOOD (ID, DATE, FOOD_INDEX);
+
+-- USER_NT: ID + DATE 범위 조회
+CREATE INDEX IDX_USER_NT_ID_DATE ON USER_NT (ID, DATE);
+
+-- USER: ID 조회
+CREATE INDEX IDX_USER_ID ON USER (ID);
@@ -0,0 +1,15 @@
+-- 사용자별 월간 집계 (advice, avg_kcal 응답용)
+-- ITEM_COUNT / KCAL_SUM: 그 달 FOOD 행 수와 칼로리 합
+-- DAY_COUNT / *_PCT_SUM: 그 달 USER_NT 행 수와 일별 영양소 백분율(소수 첫째 자리 반올림)의 합
+CREATE TABLE IF NOT EXISTS USER_NT_MONTHLY (
+    ID VARCHAR(255) NOT NULL,
+    YEAR SMALLINT NOT NULL,
+    MONTH TINYINT NOT NULL,
+    ITEM_COUNT INT NOT NULL DEFAULT 0,
+    DAY_COUNT INT NOT NULL DEFAULT 0,
+    KCAL_SUM DOUBLE NOT NULL DEFAULT 0,
+    CARBO_PCT_SUM DOUBLE NOT NULL DEFAULT 0,
+    PROTEIN_PCT_SUM DOUBLE NOT NULL DEFAULT 0,
+    FAT_PCT_SUM DOUBLE NOT NULL DEFAULT 0,
+    PRIMARY KEY (ID, YEAR, MONTH)
+);
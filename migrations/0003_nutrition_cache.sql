@@ -0,0 +1,10 @@
+-- LLM 영양 분석 결과 캐시 (nutrition_cache.py)
+-- NAMESPACE: 캐시 종류, CACHE_KEY: 정규화된 입력, PROMPT_VERSION: 프롬프트 템플릿 해시
+CREATE TABLE IF NOT EXISTS NUTRITION_CACHE (
+    NAMESPACE VARCHAR(32) NOT NULL,
+    CACHE_KEY VARCHAR(255) NOT NULL,
+    PROMPT_VERSION CHAR(16) NOT NULL,
+    RESULT TEXT NOT NULL,
+    CREATED_AT DATETIME NOT NULL,
+    PRIMARY KEY (NAMESPACE, CACHE_KEY, PROMPT_VERSION)
+);
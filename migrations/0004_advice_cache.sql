@@ -0,0 +1,13 @@
+-- 월간 데이터 버전: FOOD가 바뀔 때마다 aggregates.py가 1씩 올린다
+ALTER TABLE USER_NT_MONTHLY ADD COLUMN VERSION INT NOT NULL DEFAULT 0;
+
+-- 사용자/월별로 생성된 식단 조언 - DATA_VERSION이 현재 월간 버전과 같을 때만 사용
+CREATE TABLE IF NOT EXISTS ADVICE_CACHE (
+    ID VARCHAR(255) NOT NULL,
+    YEAR SMALLINT NOT NULL,
+    MONTH TINYINT NOT NULL,
+    DATA_VERSION INT NOT NULL,
+    ADVICE TEXT NOT NULL,
+    CREATED_AT DATETIME NOT NULL,
+    PRIMARY KEY (ID, YEAR, MONTH)
+);
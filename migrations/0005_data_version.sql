@@ -0,0 +1,9 @@
+-- 사용자/날짜별 데이터 버전 (캘린더 조회의 ETag용)
+-- FOOD/USER_NT가 바뀔 때마다 aggregates.py가 같은 트랜잭션 안에서 그 날의 VERSION을 1 올린다.
+-- 행은 지우지 않으므로 구간의 SUM(VERSION)은 그 구간에 변경이 있을 때마다 반드시 커진다.
+CREATE TABLE IF NOT EXISTS USER_DATA_VERSION (
+    ID VARCHAR(255) NOT NULL,
+    DATE DATE NOT NULL,
+    VERSION INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ID, DATE)
+);
@@ -0,0 +1,15 @@
+-- 사용자별 일별 누적합(prefix sum) 인덱스 - 구간 합계/평균을 두 번의 조회로 계산
+-- 기록이 있는 날마다 한 행: 그 날까지(포함)의 칼로리/탄수화물/단백질/지방/음식 수/기록한 날 수 누적
+-- [a, b) 구간 합계 = (DATE < b인 마지막 행) - (DATE < a인 마지막 행)
+-- aggregates.py가 FOOD 변경과 같은 트랜잭션 안에서 그 날 이후 행들을 증분 갱신한다.
+CREATE TABLE IF NOT EXISTS USER_NT_PREFIX (
+    ID VARCHAR(255) NOT NULL,
+    DATE DATE NOT NULL,
+    KCAL_CUM DOUBLE NOT NULL DEFAULT 0,
+    CARBO_CUM DOUBLE NOT NULL DEFAULT 0,
+    PROTEIN_CUM DOUBLE NOT NULL DEFAULT 0,
+    FAT_CUM DOUBLE NOT NULL DEFAULT 0,
+    ITEM_CUM INT NOT NULL DEFAULT 0,
+    DAY_CUM INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ID, DATE)
+);
@@ -0,0 +1,9 @@
+-- USER_NT는 사용자/날짜마다 한 행 - aggregates.py가 INSERT ... ON DUPLICATE KEY UPDATE로 일별 합계를 갱신한다
+-- (없는 행을 SELECT ... FOR UPDATE 한 뒤 INSERT하면 갭 락 때문에 인접한 날짜의 첫 기록끼리 교착 상태가 난다)
+-- 같은 (ID, DATE) 행이 이미 여러 개 있으면 실패하므로, 먼저 아래 쿼리로 확인하고 정리한 뒤 적용한다:
+--   SELECT ID, DATE, COUNT(*) FROM USER_NT GROUP BY ID, DATE HAVING COUNT(*) > 1;
+-- 정리 후 python aggregates.py rebuild USER_ID START END 로 합계를 다시 맞춘다.
+CREATE UNIQUE INDEX UQ_USER_NT_ID_DATE ON USER_NT (ID, DATE);
+
+-- 같은 열의 일반 인덱스는 이제 필요 없다
+DROP INDEX IDX_USER_NT_ID_DATE ON USER_NT;
@@ -0,0 +1,5 @@
+-- 백그라운드 업로드 작업(upload_jobs.py)으로 저장된 FOOD 행의 작업 id
+-- 워커가 저장 후 완료 기록 전에 죽어서 작업이 다시 실행되어도 같은 음식이 두 번 저장되지 않도록 한다
+-- (동기 업로드와 다른 경로로 추가된 행은 NULL - UNIQUE 인덱스는 NULL 중복을 허용한다)
+ALTER TABLE FOOD ADD COLUMN UPLOAD_JOB_ID VARCHAR(32) NULL;
+CREATE UNIQUE INDEX UQ_FOOD_UPLOAD_JOB_ID ON FOOD (UPLOAD_JOB_ID);
@@ -0,0 +1,8 @@
+-- 사용자별 USER_NT_PREFIX 버전 - 프로세스마다 따로 가진 누적합 메모리 캐시의 유효성 확인용
+-- prefix_index.py가 누적합을 바꿀 때마다(apply_delta / rebuild) 같은 트랜잭션 안에서 VERSION을 1 올리고,
+-- 캐시된 배열을 쓰기 전에 이 행 하나를 읽어 캐시할 때의 VERSION과 같은지 확인한다.
+CREATE TABLE IF NOT EXISTS USER_NT_PREFIX_VERSION (
+    ID VARCHAR(255) NOT NULL,
+    VERSION BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ID)
+);
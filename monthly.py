@@ -1,27 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import pymysql
-import os
+import db_pool
+import food_loader
+import fast_json
+import data_version
 from dotenv import load_dotenv
 import logging
-import calendar
+import os
+from datetime import date, timedelta
 
 load_dotenv()
 
 app = Flask(__name__)
-
-# DB Connection
-db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
-}
+app.json = fast_json.JSONProvider(app)
 
 # Logger 설정
 logging.basicConfig(level=logging.DEBUG)
 
 def get_user_nutritional_needs(user_id):
-    connection = pymysql.connect(**db_config)
+    connection = db_pool.get_connection()
     try:
         with connection.cursor() as cursor:
             sql = "SELECT BODY_WEIGHT, RDI FROM USER WHERE ID = %s"
@@ -38,78 +35,17 @@ def get_user_nutritional_needs(user_id):
     finally:
         connection.close()
 
-def get_daily_totals(user_id, date):
-    connection = pymysql.connect(**db_config)
-    try:
-        with connection.cursor() as cursor:
-            sql = "SELECT CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT FROM USER_NT WHERE ID = %s AND DATE = %s"
-            cursor.execute(sql, (user_id, date))
-            result = cursor.fetchone()
-            if result:
-                return result
-            else:
-                return None
-    except pymysql.MySQLError as e:
-        logging.error(f"Database error: {e}")
-        return None
-    finally:
-        connection.close()
+HISTORY_MAX_DAYS = int(os.getenv('HISTORY_MAX_DAYS', '3660'))  # /api/food/history 한 번에 요청할 수 있는 최대 일수
+
+# USER_NT 행이 없는 날의 백분율 기본값
+EMPTY_PERCENTAGES = {"carbohydrates_percentage": 0, "protein_percentage": 0, "fat_percentage": 0}
 
 def get_monthly_data(year, month, user_id):
-    connection = pymysql.connect(**db_config)
-    try:
-        with connection.cursor() as cursor:
-            sql = """
-                SELECT DATE, FOOD_INDEX, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL
-                FROM FOOD
-                WHERE YEAR(DATE) = %s AND MONTH(DATE) = %s AND ID = %s
-                ORDER BY DATE
-            """
-            cursor.execute(sql, (year, month, user_id))
-            results = cursor.fetchall()
-
-            num_days = calendar.monthrange(year, month)[1]  # 해당 월의 일수 계산
-            foods_list = [[] for _ in range(num_days)]  # 각 날짜별 음식 리스트
-            percentages_list = [{"carbohydrates_percentage": 0, "protein_percentage": 0, "fat_percentage": 0} for _ in range(num_days)]  # 각 날짜별 백분율 리스트
-
-            for row in results:
-                day = row[0].day - 1  # 0-based index for lists
-                food_info = {
-                    "food_index": row[1],
-                    "food_name": row[2],
-                    "protein": row[3],
-                    "fat": row[4],
-                    "carbohydrates": row[5],
-                    "calories": row[6]
-                }
-                foods_list[day].append(food_info)
-
-            # Add daily percentages
-            for day in range(num_days):
-                date_str = f"{year}-{str(month).zfill(2)}-{str(day+1).zfill(2)}"  # 1-based day for dates
-                logging.debug(f"Fetching daily totals for date: {date_str}")
-                daily_totals = get_daily_totals(user_id, date_str)
-                logging.debug(f"Daily totals for {date_str}: {daily_totals}")
-                if daily_totals:
-                    carb_total, protein_total, fat_total, rd_carb, rd_protein, rd_fat = daily_totals
-                    percentages_list[day] = {
-                        "carbohydrates_percentage": round((carb_total / rd_carb) * 100, 1) if rd_carb > 0 else 0,
-                        "protein_percentage": round((protein_total / rd_protein) * 100, 1) if rd_protein > 0 else 0,
-                        "fat_percentage": round((fat_total / rd_fat) * 100, 1) if rd_fat > 0 else 0
-                    }
-
-            return {
-                "foods": foods_list,
-                "percentages": percentages_list
-            }
-    except pymysql.MySQLError as e:
-        logging.error(f"Database error: {e}")
-        return {"error": "Database error"}
-    finally:
-        connection.close()
+    return food_loader.load_month(year, month, user_id, EMPTY_PERCENTAGES)
 
 
 @app.route('/api/food/quarterly', methods=['GET'])
+@fast_json.compressed
 def get_quarterly_food():
     year = request.args.get('year')
     start_month = request.args.get('month')
@@ -126,14 +62,53 @@ def get_quarterly_food():
     except ValueError:
         return jsonify({"error": "Year and month must be integers."}), 400
 
-    quarterly_data = {}
-    for i in range(-1, 2):  # 이전 달, 현재 달, 다음 달 순서로 데이터를 가져오기
-        month = (start_month + i - 1) % 12 + 1
-        current_year = year + (start_month + i - 1) // 12
-        monthly_data = get_monthly_data(current_year, month, user_id)
-        quarterly_data[f"{current_year}-{str(month).zfill(2)}"] = monthly_data
+    # 이전 달, 현재 달, 다음 달 세 달 구간을 한 번에 가져오기
+    months = food_loader.quarter_months(year, start_month)
+    # 구간에 바뀐 기록이 없으면 데이터를 읽지 않고 304
+    etag = data_version.range_etag("quarterly", user_id, *food_loader.months_range(months))
+    if data_version.is_fresh(etag):
+        return data_version.not_modified(etag)
+    quarterly_data = food_loader.load_months(months, user_id, EMPTY_PERCENTAGES)
+    if any("error" in data for data in quarterly_data.values()):
+        etag = None  # 오류 응답은 캐시되지 않도록
+
+    return data_version.with_etag(jsonify(quarterly_data), etag)
+
+def history_lines(user_id, start, end):
+    # NDJSON: 한 줄에 하루 {"date": "YYYY-MM-DD", "foods": [...], "percentages": {...}}
+    try:
+        for day, foods, percentages in food_loader.stream_days(user_id, start, end, EMPTY_PERCENTAGES):
+            yield app.json.dumps({"date": day.isoformat(), "foods": foods, "percentages": percentages}) + "\n"
+    except pymysql.MySQLError as e:
+        # 이미 200으로 응답을 시작했으므로 마지막 줄에 오류를 남긴다
+        logging.error(f"Database error: {e}")
+        yield app.json.dumps({"error": "Database error"}) + "\n"
+
+
+# 긴 구간(1년 이상)의 기록을 하루에 한 줄씩 스트리밍 - 기록이 없는 날은 보내지 않는다
+# start, end: YYYY-MM-DD (end 포함)
+@app.route('/api/food/history', methods=['GET'])
+def get_food_history():
+    start = request.args.get('start')
+    end = request.args.get('end')
+    user_id = request.args.get('user_id')
+
+    if not start or not end or not user_id:
+        return jsonify({"error": "start, end, and user_id are required"}), 400
 
-    return jsonify(quarterly_data)
+    try:
+        start = date.fromisoformat(start)
+        end = date.fromisoformat(end)
+    except ValueError:
+        return jsonify({"error": "start and end must be dates in YYYY-MM-DD format."}), 400
+    if end < start:
+        return jsonify({"error": "end must not be earlier than start."}), 400
+    if (end - start).days + 1 > HISTORY_MAX_DAYS:
+        return jsonify({"error": f"Range must be at most {HISTORY_MAX_DAYS} days."}), 400
+
+    return Response(stream_with_context(history_lines(user_id, start, end + timedelta(days=1))),
+                    mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)  # 다른 포트로 실행하여 send.py와 충돌 방지
\ No newline at end of file
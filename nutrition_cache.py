@@ -0,0 +1,216 @@
+# nutrition_cache.py
+# LLM 영양 분석 결과 캐시
+# 1단계: 프로세스 내 LRU (크기 제한 + TTL)
+# 2단계: MySQL NUTRITION_CACHE 테이블 (프로세스/서버 간 공유)
+# 키에는 프롬프트 버전이 포함되어 있어서 프롬프트 템플릿이 바뀌면 이전 결과는 자동으로 쓰이지 않는다.
+#
+# 사용법:
+#   python nutrition_cache.py invalidate         # 현재 프롬프트 버전이 아닌 행 삭제
+#   python nutrition_cache.py invalidate --all   # 전체 삭제
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import pymysql
+import db_pool
+
+CACHE_MAX_SIZE = int(os.getenv('NUTRITION_CACHE_MAX_SIZE', '10000'))
+CACHE_TTL = float(os.getenv('NUTRITION_CACHE_TTL', '3600'))                # 메모리 캐시 유지 시간(초)
+CACHE_DB_TTL = int(os.getenv('NUTRITION_CACHE_DB_TTL', str(30 * 86400)))  # DB 캐시 유지 시간(초)
+
+# "돈까스 2개 먹었어" 같은 입력에서 먹었다는 표현과 목적격 조사를 떼어낸다
+EATING_SUFFIX = re.compile(r"\s*(?:을|를)?\s*(?:먹었어요|먹었어|먹었다|먹었습니다|먹음|먹어요|먹었음)$")
+COUNTERS = "개|인분|그릇|조각|잔|컵|장|공기|봉지|캔|병|접시|줄|마리|알|쪽"
+NATIVE_NUMBERS = {"한": "1", "두": "2", "세": "3", "석": "3", "네": "4", "넉": "4", "다섯": "5",
+                  "여섯": "6", "일곱": "7", "여덟": "8", "아홉": "9", "열": "10", "반": "0.5"}
+NATIVE_QUANTITY = re.compile(rf"(?<![가-힣])({'|'.join(NATIVE_NUMBERS)})\s*({COUNTERS})")
+DIGIT_QUANTITY = re.compile(rf"(\d+(?:\.\d+)?)\s*({COUNTERS})")
+ONE_QUANTITY = re.compile(rf"(?<![\d.])1(?:{COUNTERS})")
+
+
+def normalize_quantity_text(text):
+    # 먹었다는 표현을 떼고 수량을 "2개" 같은 숫자+단위 형태로 맞춘다
+    text = unicodedata.normalize("NFKC", str(text)).strip().lower()
+    text = re.sub(r"[~!?.,]+$", "", text)
+    text = EATING_SUFFIX.sub("", text)
+    text = NATIVE_QUANTITY.sub(lambda m: NATIVE_NUMBERS[m.group(1)] + m.group(2), text)
+    return DIGIT_QUANTITY.sub(r"\1\2", text)
+
+
+def normalize_food_name(text):
+    # 공백, 조사, 수량 표기를 정리해서 같은 음식이 같은 키가 되도록 한다
+    text = normalize_quantity_text(text)
+    # 수량 1은 수량을 쓰지 않은 것과 같은 기본값으로 본다
+    text = ONE_QUANTITY.sub("", text)
+    return " ".join(text.split())
+
+
+def prompt_version(*parts):
+    return hashlib.sha256("\n".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+
+
+class LRUCache:
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (저장 시각, 값)
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class TwoTierCache:
+    # namespace: 같은 테이블을 쓰는 캐시들을 구분 (예: 텍스트 입력, 이미지 해시)
+    # version: 프롬프트 버전 - 템플릿이 바뀌면 키가 달라진다
+    # key_func: 원본 입력을 캐시 키로 바꾸는 함수
+    def __init__(self, namespace, version, key_func=None, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL, db_ttl=CACHE_DB_TTL):
+        self.namespace = namespace
+        self.version = version
+        self.key_func = key_func or (lambda value: value)
+        self.db_ttl = db_ttl
+        self.memory = LRUCache(max_size, ttl)
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "db_errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def key(self, value):
+        return self.key_func(value)
+
+    def get(self, value):
+        key = self.key(value)
+        if not key:
+            return None
+        result = self.memory.get(key)
+        if result is not None:
+            self._count("memory_hits")
+            return result
+
+        result = self._db_get(key)
+        if result is not None:
+            self._count("db_hits")
+            self.memory.set(key, result)
+            return result
+
+        self._count("misses")
+        return None
+
+    def set(self, value, result):
+        key = self.key(value)
+        if not key:
+            return
+        self.memory.set(key, result)
+        self._db_set(key, result)
+        self._count("stores")
+
+    def _db_get(self, key):
+        try:
+            connection = db_pool.get_connection()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT RESULT FROM NUTRITION_CACHE
+                        WHERE NAMESPACE = %s AND CACHE_KEY = %s AND PROMPT_VERSION = %s
+                          AND CREATED_AT >= NOW() - INTERVAL %s SECOND
+                    """, (self.namespace, key, self.version, self.db_ttl))
+                    row = cursor.fetchone()
+                    return json.loads(row[0]) if row else None
+            finally:
+                connection.close()
+        except pymysql.MySQLError as e:
+            # 캐시 장애가 요청 실패로 이어지지 않도록 미스로 처리
+            logging.warning(f"Nutrition cache read failed: {e}")
+            self._count("db_errors")
+            return None
+
+    def _db_set(self, key, result):
+        try:
+            connection = db_pool.get_connection()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                        INSERT INTO NUTRITION_CACHE (NAMESPACE, CACHE_KEY, PROMPT_VERSION, RESULT, CREATED_AT)
+                        VALUES (%s, %s, %s, %s, NOW())
+                        ON DUPLICATE KEY UPDATE RESULT = VALUES(RESULT), CREATED_AT = VALUES(CREATED_AT)
+                    """, (self.namespace, key, self.version, json.dumps(result, ensure_ascii=False)))
+                connection.commit()
+            finally:
+                connection.close()
+        except pymysql.MySQLError as e:
+            logging.warning(f"Nutrition cache write failed: {e}")
+            self._count("db_errors")
+
+    def invalidate(self, all_versions=False):
+        # 메모리 캐시는 비우고, DB는 현재 버전이 아닌 행(또는 전체)을 지운다
+        self.memory.clear()
+        connection = db_pool.get_connection()
+        try:
+            with connection.cursor() as cursor:
+                if all_versions:
+                    cursor.execute("DELETE FROM NUTRITION_CACHE WHERE NAMESPACE = %s", (self.namespace,))
+                else:
+                    cursor.execute("DELETE FROM NUTRITION_CACHE WHERE NAMESPACE = %s AND PROMPT_VERSION <> %s",
+                                   (self.namespace, self.version))
+                deleted = cursor.rowcount
+            connection.commit()
+            logging.info(f"Invalidated {deleted} cached results in namespace {self.namespace}")
+            return deleted
+        finally:
+            connection.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["db_hits"]) / lookups if lookups else 0.0
+        stats["memory_size"] = len(self.memory)
+        stats["version"] = self.version
+        return stats
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) >= 2 and sys.argv[1] == "invalidate":
+        import llm
+        llm.cache.invalidate(all_versions="--all" in sys.argv[2:])
+    else:
+        print("Usage: python nutrition_cache.py invalidate [--all]")
+        sys.exit(2)
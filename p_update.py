@@ -1,35 +1,18 @@
 from flask import Flask, request, jsonify
-import mysql.connector
-from mysql.connector import Error
+from pymysql import MySQLError as Error
+import db_pool
 from dotenv import load_dotenv
-import os
 
 print("Loading .env file...")
 load_dotenv()
 
-db_host = os.getenv('DB_HOST')
-db_name = os.getenv('DB_NAME')
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASSWORD')
-
-# 환경 변수 확인을 위한 디버그 출력
-print(f"DB_HOST: {db_host}")
-print(f"DB_NAME: {db_name}")
-print(f"DB_USER: {db_user}")
-print(f"DB_PASSWORD: {db_password}")
-
 app = Flask(__name__)
 
 # 데이터베이스 연결 설정
 def create_db_connection():
     try:
         print("Attempting to connect to the database...")
-        connection = mysql.connector.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
+        connection = db_pool.get_connection()
         print("Database connection successful!")
         return connection
     except Error as e:
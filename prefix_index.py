@@ -0,0 +1,233 @@
+# prefix_index.py
+# 사용자별 일별 누적합(prefix sum) 인덱스 - 주/월/년 단위 추이 차트의 구간 합계와 평균
+# USER_NT_PREFIX: 기록이 있는 날마다 그 날까지의 칼로리/탄수화물/단백질/지방/음식 수/기록한 날 수 누적
+# [start, end) 구간 합계 = (DATE < end인 마지막 누적) - (DATE < start인 마지막 누적)
+#   - 메모리 캐시: 사용자별 (날짜 배열, 누적 배열)을 보관하고 np.searchsorted 두 번으로 계산.
+#     캐시된 배열을 쓰기 전에 USER_NT_PREFIX_VERSION 한 행을 읽어 캐시할 때의 버전과 비교하므로
+#     다른 프로세스(다른 워커)에서 바뀐 기록도 바로 반영된다.
+#   - 캐시를 끄면(PREFIX_CACHE_TTL=0) DB 인덱스 조회 두 번
+# FOOD가 바뀌면 aggregates.py가 같은 트랜잭션 안에서 apply_delta로 그 날 이후의 누적을 갱신하고 버전을 올린다.
+# 쓰기 비용: 그 날 이후 기록이 있는 날 수만큼 행을 갱신한다. 오늘 기록은 행 1개지만,
+# 1년 전 기록을 고치면 그 뒤의 약 365행을 갱신한다 (구간 조회를 O(1)로 만드는 대가).
+#
+# 사용법:
+#   python prefix_index.py rebuild [USER_ID]   # FOOD / USER_NT에서 누적합을 다시 만든다 (USER_ID가 없으면 모든 사용자)
+
+import os
+import sys
+import logging
+import threading
+
+import numpy as np
+import pymysql
+
+import db_pool
+from nutrition_cache import LRUCache
+
+PREFIX_CACHE_TTL = float(os.getenv('PREFIX_CACHE_TTL', '300'))            # 메모리 캐시 유지 시간(초), 0이면 매번 DB
+PREFIX_CACHE_MAX_USERS = int(os.getenv('PREFIX_CACHE_MAX_USERS', '1000'))
+
+# 누적 열 순서 (KCAL, CARBO, PROTEIN, FAT, ITEM, DAY)
+COLUMNS = "KCAL_CUM, CARBO_CUM, PROTEIN_CUM, FAT_CUM, ITEM_CUM, DAY_CUM"
+EMPTY = (0, 0, 0, 0, 0, 0)
+
+
+class PrefixCache:
+    # 사용자별 (버전, (날짜 서수 배열, 누적 배열 (n, 6)))
+    # 버전과 배열을 같은 트랜잭션(같은 스냅샷)에서 읽으므로, 커밋 전 값이 캐시되더라도
+    # 커밋으로 버전이 바뀌면 다음 조회에서 다시 읽는다.
+    def __init__(self, ttl=PREFIX_CACHE_TTL, max_users=PREFIX_CACHE_MAX_USERS):
+        self.memory = LRUCache(max_users, ttl)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "loads": 0, "stale": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, cursor, user_id):
+        version = select_version(cursor, user_id)
+        entry = self.memory.get(user_id)
+        if entry is not None:
+            if entry[0] == version:
+                self._count("hits")
+                return entry[1]
+            self._count("stale")
+
+        arrays = load_arrays(cursor, user_id)
+        self._count("loads")
+        self.memory.set(user_id, (version, arrays))
+        return arrays
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["users"] = len(self.memory)
+        return stats
+
+
+cache = PrefixCache()
+
+
+def bump_version(cursor, user_id):
+    cursor.execute("""
+        INSERT INTO USER_NT_PREFIX_VERSION (ID, VERSION) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE VERSION = VERSION + 1
+    """, (user_id,))
+
+
+def select_version(cursor, user_id):
+    cursor.execute("SELECT VERSION FROM USER_NT_PREFIX_VERSION WHERE ID = %s", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def apply_delta(cursor, user_id, day, delta, item_change, day_change):
+    # aggregates.apply_food_delta에서 호출 - delta: (탄수화물, 단백질, 지방, 칼로리)
+    # 호출하는 쪽이 이미 USER 행을 잠갔으므로(aggregates.lock_user) 같은 사용자의 갱신은 차례로 실행된다.
+    # 그 날 또는 그 전 마지막 행을 한 번에 읽어서, 그 날 행이 없으면 전날까지의 누적으로 만들고
+    # 그 날 이후 모든 행에 변화량을 더한다
+    cursor.execute(f"""
+        SELECT DATE, {COLUMNS} FROM USER_NT_PREFIX
+        WHERE ID = %s AND DATE <= %s
+        ORDER BY DATE DESC LIMIT 1 FOR UPDATE
+    """, (user_id, day))
+    row = cursor.fetchone()
+    if row is None or row[0] != day:
+        cursor.execute(f"""
+            INSERT INTO USER_NT_PREFIX (ID, DATE, {COLUMNS})
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (user_id, day, *(row[1:] if row else EMPTY)))
+
+    carbo, protein, fat, kcal = delta
+    cursor.execute("""
+        UPDATE USER_NT_PREFIX
+        SET KCAL_CUM = KCAL_CUM + %s, CARBO_CUM = CARBO_CUM + %s, PROTEIN_CUM = PROTEIN_CUM + %s,
+            FAT_CUM = FAT_CUM + %s, ITEM_CUM = ITEM_CUM + %s, DAY_CUM = DAY_CUM + %s
+        WHERE ID = %s AND DATE >= %s
+    """, (kcal, carbo, protein, fat, item_change, day_change, user_id, day))
+    bump_version(cursor, user_id)
+
+
+def load_arrays(cursor, user_id):
+    cursor.execute(f"SELECT DATE, {COLUMNS} FROM USER_NT_PREFIX WHERE ID = %s ORDER BY DATE", (user_id,))
+    rows = cursor.fetchall()
+    days = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    cumulative = np.fromiter((float(value) for row in rows for value in row[1:]),
+                             dtype=np.float64, count=len(rows) * 6).reshape(-1, 6)
+    return days, cumulative
+
+
+def cumulative_before(arrays, day):
+    # day 전날까지의 누적 (그런 행이 없으면 0)
+    days, cumulative = arrays
+    index = np.searchsorted(days, day.toordinal()) - 1
+    return cumulative[index] if index >= 0 else np.zeros(6)
+
+
+def select_cumulative_before(cursor, user_id, day):
+    cursor.execute(f"""
+        SELECT {COLUMNS} FROM USER_NT_PREFIX
+        WHERE ID = %s AND DATE < %s
+        ORDER BY DATE DESC LIMIT 1
+    """, (user_id, day))
+    return np.array(cursor.fetchone() or EMPTY, dtype=np.float64)
+
+
+def summarize(values):
+    kcal, carbo, protein, fat, items, days = (float(value) for value in values)
+    items, days = int(round(items)), int(round(days))
+    return {
+        "total": {"kcal": round(kcal, 1), "carbohydrates": round(carbo, 1),
+                  "protein": round(protein, 1), "fat": round(fat, 1)},
+        "item_count": items,
+        "logged_days": days,
+        # avg_kcal과 같은 기준: 음식 하나당 평균 칼로리
+        "average_kcal": round(kcal / items, 1) if items else None,
+        # 기록한 날 하루 평균
+        "daily_average": {
+            "kcal": round(kcal / days, 1) if days else None,
+            "carbohydrates": round(carbo / days, 1) if days else None,
+            "protein": round(protein / days, 1) if days else None,
+            "fat": round(fat / days, 1) if days else None,
+        },
+    }
+
+
+def range_totals(user_id, start, end):
+    # [start, end) 구간 합계/평균
+    try:
+        connection = db_pool.get_connection()
+        try:
+            with connection.cursor() as cursor:
+                if PREFIX_CACHE_TTL > 0:
+                    arrays = cache.get(cursor, user_id)
+                    values = cumulative_before(arrays, end) - cumulative_before(arrays, start)
+                else:
+                    values = select_cumulative_before(cursor, user_id, end) - select_cumulative_before(cursor, user_id, start)
+        finally:
+            connection.close()
+    except pymysql.MySQLError as e:
+        logging.error(f"Database error: {e}")
+        return {"error": "Database error"}
+    return summarize(values)
+
+
+def rebuild(user_id):
+    # 한 사용자의 누적합을 FOOD / USER_NT에서 다시 만든다
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            # aggregates 훅과 같은 USER 행 잠금 - 다시 만드는 동안 그 사용자의 FOOD 변경을 막는다
+            cursor.execute("SELECT ID FROM USER WHERE ID = %s FOR UPDATE", (user_id,))
+            cursor.execute("SELECT DATE FROM USER_NT WHERE ID = %s", (user_id,))
+            logged_days = {row[0] for row in cursor.fetchall()}
+
+            cursor.execute("""
+                SELECT DATE(DATE), SUM(FOOD_KCAL), SUM(FOOD_CH), SUM(FOOD_PT), SUM(FOOD_FAT), COUNT(*)
+                FROM FOOD WHERE ID = %s
+                GROUP BY DATE(DATE)
+            """, (user_id,))
+            food_days = {row[0]: row[1:] for row in cursor.fetchall()}
+
+            days = sorted(logged_days | set(food_days))
+            daily = np.array([[float(value or 0) for value in food_days.get(day, EMPTY[:5])] + [1.0 if day in logged_days else 0.0]
+                              for day in days], dtype=np.float64).reshape(-1, 6)
+            cumulative = np.cumsum(daily, axis=0)
+
+            cursor.execute("DELETE FROM USER_NT_PREFIX WHERE ID = %s", (user_id,))
+            if days:
+                cursor.executemany(f"""
+                    INSERT INTO USER_NT_PREFIX (ID, DATE, {COLUMNS})
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, [(user_id, day, *row[:4], int(row[4]), int(row[5])) for day, row in zip(days, cumulative.tolist())])
+            bump_version(cursor, user_id)
+        connection.commit()
+    finally:
+        connection.close()
+    logging.info(f"Rebuilt USER_NT_PREFIX for {user_id}: {len(days)} days")
+    return len(days)
+
+
+def rebuild_all():
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT ID FROM USER_NT UNION SELECT ID FROM FOOD")
+            user_ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        connection.close()
+    for user_id in user_ids:
+        rebuild(user_id)
+    return len(user_ids)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) == 3 and sys.argv[1] == "rebuild":
+        rebuild(sys.argv[2])
+    elif len(sys.argv) == 2 and sys.argv[1] == "rebuild":
+        rebuild_all()
+    else:
+        print("Usage: python prefix_index.py rebuild [USER_ID]")
+        sys.exit(2)
@@ -1,35 +1,18 @@
 from flask import Flask, request, jsonify
-import mysql.connector
-from mysql.connector import Error
+from pymysql import MySQLError as Error
+import db_pool
 from dotenv import load_dotenv
-import os
 
 print("Loading .env file...")
 load_dotenv()
 
-db_host = os.getenv('DB_HOST')
-db_name = os.getenv('DB_NAME')
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASS')
-
-# 환경 변수 확인을 위한 디버그 출력
-print(f"DB_HOST: {db_host}")
-print(f"DB_NAME: {db_name}")
-print(f"DB_USER: {db_user}")
-print(f"DB_PASSWORD: {db_password}")
-
 app = Flask(__name__)
 
 # 데이터베이스 연결 설정
 def create_db_connection():
     try:
         print("Attempting to connect to the database...")
-        connection = mysql.connector.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
+        connection = db_pool.get_connection()
         print("Database connection successful!")
         return connection
     except Error as e:
@@ -67,9 +50,8 @@ def register():
     except Error as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+        cursor.close()
+        connection.close()
 
 # 애플리케이션 시작 시 임의의 데이터 삽입
 def insert_test_data():
@@ -109,9 +91,8 @@ def insert_test_data():
     except Error as e:
         print(f"An error occurred: {str(e)}")
     finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+        cursor.close()
+        connection.close()
 
 if __name__ == '__main__':
     print("Starting application...")
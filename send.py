@@ -1,41 +1,40 @@
 # send.py
 
 from flask import Flask, request, jsonify
-import pymysql
-import os
+import db_pool
+import aggregates
 from dotenv import load_dotenv
 from datetime import datetime
 import llm
+import llm_gateway
 
 load_dotenv()
 
 app = Flask(__name__)
-
-# DB Connection
-db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
-}
+llm_gateway.init_app(app)
 
 def save_to_db(user_id, nutrition_info):
-    connection = pymysql.connect(**db_config)
+    connection = db_pool.get_connection()
+    now = datetime.now()
     try:
         with connection.cursor() as cursor:
+            # 다른 FOOD 쓰기와 같은 순서(USER -> FOOD)로 잠근다
+            aggregates.lock_user(cursor, user_id)
             sql = """
                 INSERT INTO FOOD (ID, DATE, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL)
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
             cursor.execute(sql, (
                 user_id,
-                datetime.now(),
+                now,
                 nutrition_info['food_name'],
                 nutrition_info['protein'],
                 nutrition_info['fat'],
                 nutrition_info['carbohydrate'],
                 nutrition_info['calorie']
             ))
+            # 같은 트랜잭션에서 USER_NT 일별 합계 갱신
+            aggregates.on_food_insert(cursor, user_id, now, nutrition_info)
             print("Data saved to database")  # Debugging 출력 추가
         connection.commit()
     finally:
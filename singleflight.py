@@ -0,0 +1,81 @@
+# singleflight.py
+# 같은 키의 작업이 이미 진행 중이면 새로 실행하지 않고 그 결과를 함께 기다린다 (request coalescing)
+# 예: 인기 메뉴 "마라탕"이 몇 초 사이에 여러 번 들어와도 LLM 호출은 한 번만 나간다
+# 동기 호출(do)과 비동기 호출(ado)이 같은 진행 중 목록을 공유하므로,
+# Flask 스레드와 백그라운드 이벤트 루프에서 들어온 같은 키의 요청도 하나로 합쳐진다.
+# 기다리는 쪽(follower)은 자기 timeout까지만 기다리고 TimeoutError로 빠진다 - 실행 중인 작업은 취소하지 않는다.
+
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class Group:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future
+        self._counters = {"leaders": 0, "followers": 0, "detached": 0}
+
+    def _join(self, key):
+        # (future, 직접 실행해야 하는지)
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._counters["followers"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._counters["leaders"] += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _detach(self, key, timeout):
+        with self._lock:
+            self._counters["detached"] += 1
+        return TimeoutError(f"Gave up waiting {timeout:.1f}s for in-flight {self.name} call {key!r}")
+
+    def do(self, key, func, timeout=None):
+        # timeout: 다른 요청이 실행 중일 때 그 결과를 기다릴 최대 시간(초), None이면 끝날 때까지
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return future.result(timeout)
+            except FutureTimeout:
+                raise self._detach(key, timeout) from None
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key, coro_func, timeout=None):
+        future, leader = self._join(key)
+        if not leader:
+            # shield: 기다리다 빠져도 wrap_future를 통해 원래 Future(리더의 작업)가 취소되지 않도록
+            try:
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                raise self._detach(key, timeout) from None
+        try:
+            result = await coro_func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
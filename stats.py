@@ -0,0 +1,187 @@
+# stats.py
+# 임의 구간(여러 해 포함)의 영양 통계를 NumPy 벡터 연산으로 계산
+# FOOD / USER_NT 구간을 한 번씩 읽어 날짜 오프셋 기준의 열(column) 배열로 만든 뒤
+#   - 일별 칼로리 / 음식 수 (np.bincount)
+#   - USER_NT 권장량(RD_*) 대비 일별 탄수화물/단백질/지방 백분율
+#   - 평균, 중앙값, 백분위수, 최근 7일/30일 이동 평균 (누적합 차이)
+#   - 목표(USER.RDI, 권장량 100%)를 넘거나 못 미친 날 수
+# 를 날짜마다 파이썬 루프를 돌지 않고 한 번에 계산한다.
+# 이동 평균은 구간 시작 전 (가장 긴 창 - 1)일도 함께 읽어서 첫날부터 온전한 창으로 계산한다.
+#
+# 사용법:
+#   start, end = stats.parse_range("2023-01-01", "2024-12-31")   # end 포함 -> [start, end)
+#   result = stats.range_stats(user_id, start, end)
+
+import os
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+import pymysql
+
+import db_pool
+from aggregates import to_number
+
+STATS_MAX_DAYS = int(os.getenv('STATS_MAX_DAYS', '3660'))                        # 한 번에 요청할 수 있는 최대 일수
+STATS_TARGET_TOLERANCE = float(os.getenv('STATS_TARGET_TOLERANCE', '0.1'))       # 목표 ±10% 안이면 달성으로 본다
+STATS_PERCENTILES = (10, 25, 75, 90)  # 중앙값(50)은 median으로 따로
+ROLLING_WINDOWS = (7, 30)
+MACROS = ("carbohydrates", "protein", "fat")
+
+
+def parse_range(start, end, max_days=STATS_MAX_DAYS):
+    # "YYYY-MM-DD" 두 개 (end 포함) -> [start, end) / 잘못된 값이면 ValueError(응답에 쓸 메시지)
+    # max_days=None 이면 구간 길이를 제한하지 않는다
+    try:
+        start = date.fromisoformat(start)
+        end = date.fromisoformat(end)
+    except (TypeError, ValueError):
+        raise ValueError("start and end must be dates in YYYY-MM-DD format.")
+    if end < start:
+        raise ValueError("end must not be earlier than start.")
+    if max_days is not None and (end - start).days + 1 > max_days:
+        raise ValueError(f"Range must be at most {max_days} days.")
+    return start, end + timedelta(days=1)
+
+
+def load_columns(user_id, start, end):
+    # [start, end) 구간을 열 배열로 읽는다. 오프셋은 start로부터의 일수
+    connection = db_pool.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT DATEDIFF(DATE, %s), FOOD_KCAL
+                FROM FOOD
+                WHERE ID = %s AND DATE >= %s AND DATE < %s
+            """, (start, user_id, start, end))
+            food_rows = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT DATEDIFF(DATE, %s), CARBO, PROTEIN, FAT, RD_CARBO, RD_PROTEIN, RD_FAT
+                FROM USER_NT
+                WHERE ID = %s AND DATE >= %s AND DATE < %s
+            """, (start, user_id, start, end))
+            totals_rows = cursor.fetchall()
+
+            cursor.execute("SELECT RDI FROM USER WHERE ID = %s", (user_id,))
+            user = cursor.fetchone()
+    except pymysql.MySQLError as e:
+        logging.error(f"Database error: {e}")
+        return {"error": "Database error"}
+    finally:
+        connection.close()
+
+    # FOOD_KCAL에는 LLM이 만든 "300kcal" 같은 문자열도 있으므로 to_number로 맞춘다
+    return {
+        "days": (end - start).days,
+        "food_offset": np.fromiter((row[0] for row in food_rows), dtype=np.int64, count=len(food_rows)),
+        "food_kcal": np.fromiter((to_number(row[1]) for row in food_rows), dtype=np.float64, count=len(food_rows)),
+        "totals_offset": np.fromiter((row[0] for row in totals_rows), dtype=np.int64, count=len(totals_rows)),
+        "totals": np.fromiter((to_number(value) for row in totals_rows for value in row[1:]),
+                              dtype=np.float64, count=len(totals_rows) * 6).reshape(-1, 6),
+        "rdi": to_number(user[0]) if user and user[0] is not None else None,
+    }
+
+
+def daily_arrays(columns):
+    # 날짜별 배열: 칼로리, 음식 수, 백분율 (n, 3) - USER_NT 행이 없는 날의 백분율은 NaN
+    days = columns["days"]
+    kcal = np.bincount(columns["food_offset"], weights=columns["food_kcal"], minlength=days)
+    items = np.bincount(columns["food_offset"], minlength=days)
+
+    totals = columns["totals"]
+    recommended = totals[:, 3:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # food_loader.calc_percentages와 같은 규칙: 소수 첫째 자리 반올림, 권장량이 0이면 0
+        values = np.where(recommended > 0, np.round(totals[:, :3] / recommended * 100, 1), 0.0)
+    percentages = np.full((days, 3), np.nan)
+    percentages[columns["totals_offset"]] = values
+    return kcal, items, percentages
+
+
+def rolling_mean(values, observed, window):
+    # 최근 window일(당일 포함) 중 기록이 있는 날의 평균 - 창 안에 기록이 없으면 NaN
+    sums = np.concatenate(([0.0], np.cumsum(np.where(observed, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(observed)))
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    window_counts = counts[upper] - counts[lower]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(window_counts > 0, (sums[upper] - sums[lower]) / window_counts, np.nan)
+
+
+def rounded(value):
+    return None if value is None or np.isnan(value) else round(float(value), 1)
+
+
+def series(values):
+    # 날짜별 배열 -> JSON 리스트 (NaN은 null)
+    result = np.round(values, 1).astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+
+def describe(values, target=None):
+    # values: 기록이 있는 날의 값만 모은 1차원 배열
+    result = {"days": int(values.size)}
+    if values.size == 0:
+        result.update({"mean": None, "median": None, "min": None, "max": None})
+        result.update({f"p{q}": None for q in STATS_PERCENTILES})
+    else:
+        result.update({
+            "mean": rounded(values.mean()),
+            "median": rounded(np.median(values)),
+            "min": rounded(values.min()),
+            "max": rounded(values.max()),
+        })
+        result.update({f"p{q}": rounded(value) for q, value in zip(STATS_PERCENTILES, np.percentile(values, STATS_PERCENTILES))})
+
+    if target is not None and target > 0:
+        over = int(np.count_nonzero(values > target * (1 + STATS_TARGET_TOLERANCE)))
+        under = int(np.count_nonzero(values < target * (1 - STATS_TARGET_TOLERANCE)))
+        result.update({"target": rounded(target), "days_over": over, "days_under": under,
+                       "days_on_target": int(values.size) - over - under})
+    return result
+
+
+def compute(columns, lookback=0, with_series=True):
+    # columns: load_columns 결과. 앞쪽 lookback일은 이동 평균 계산에만 쓰고 통계에서는 뺀다
+    kcal, items, percentages = daily_arrays(columns)
+    logged = items > 0
+
+    rolling = {window: rolling_mean(kcal, logged, window)[lookback:] for window in ROLLING_WINDOWS}
+    kcal, items, percentages, logged = kcal[lookback:], items[lookback:], percentages[lookback:], logged[lookback:]
+
+    total_items = int(items.sum())
+    result = {
+        "days": int(kcal.size),
+        "logged_days": int(np.count_nonzero(logged)),
+        "item_count": total_items,
+        "average_kcal_per_item": rounded(kcal.sum() / total_items) if total_items else None,
+        "kcal": describe(kcal[logged], columns["rdi"]),
+    }
+    for index, name in enumerate(MACROS):
+        column = percentages[:, index]
+        # 백분율의 목표는 권장량의 100%
+        result[f"{name}_percentage"] = describe(column[~np.isnan(column)], 100.0)
+
+    if with_series:
+        daily = {"kcal": series(np.where(logged, kcal, np.nan))}
+        for window in ROLLING_WINDOWS:
+            daily[f"kcal_rolling_{window}"] = series(rolling[window])
+        for index, name in enumerate(MACROS):
+            daily[f"{name}_percentage"] = series(percentages[:, index])
+        result["daily"] = daily
+    return result
+
+
+def range_stats(user_id, start, end, with_series=True):
+    # [start, end) 구간 통계 - 이동 평균용으로 앞쪽 (가장 긴 창 - 1)일을 더 읽는다
+    lookback = max(ROLLING_WINDOWS) - 1
+    columns = load_columns(user_id, start - timedelta(days=lookback), end)
+    if "error" in columns:
+        return columns
+    result = compute(columns, lookback, with_series)
+    result["start"] = start.isoformat()
+    result["end"] = (end - timedelta(days=1)).isoformat()
+    return result
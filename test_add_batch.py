@@ -0,0 +1,67 @@
+import requests
+import json
+import threading
+
+def test_add_food_batch(user_id, date, food_names):
+    url = "http://localhost:5000/api/add_food/batch"
+    headers = {'Content-Type': 'application/json'}
+    data = {
+        "ID": user_id,
+        "DATE": date,
+        "FOOD_NAMES": food_names
+    }
+    response = requests.post(url, headers=headers, data=json.dumps(data))
+
+    try:
+        response_json = response.json()
+    except requests.exceptions.JSONDecodeError:
+        response_json = None
+
+    if response.status_code == 201:
+        print("Success:", json.dumps(response_json, indent=4, ensure_ascii=False))
+    else:
+        print("Error:", response.status_code, response_json)
+
+def test_batch_with_concurrent_update(user_id, date, food_names, food_index, new_food_name, update_url, rounds=5):
+    # 같은 사용자/날짜에 일괄 추가와 기존 음식 수정을 동시에 보낸다
+    # 잠금 순서가 어긋나 있으면 MySQL이 한쪽을 교착 상태(Deadlock found ...)로 끊어서 500이 나온다
+    results = []
+
+    def post(url, data):
+        response = requests.post(url, headers={'Content-Type': 'application/json'}, data=json.dumps(data))
+        try:
+            response_json = response.json()
+        except requests.exceptions.JSONDecodeError:
+            response_json = None
+        results.append((url.rsplit("/", 1)[-1], response.status_code, response_json))
+
+    for _ in range(rounds):
+        threads = [
+            threading.Thread(target=post, args=("http://localhost:5000/api/add_food/batch",
+                                                {"ID": user_id, "DATE": date, "FOOD_NAMES": food_names})),
+            threading.Thread(target=post, args=(update_url,
+                                                {"ID": user_id, "DATE": date, "FOOD_INDEX": food_index,
+                                                 "NEW_FOOD_NAME": new_food_name})),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    deadlocks = [result for result in results if result[1] == 500 and "Deadlock" in json.dumps(result[2])]
+    for name, status, _ in results:
+        print(f"{name}: {status}")
+    print("Deadlocks:", len(deadlocks))
+
+if __name__ == '__main__':
+    test_user_id = "상엽"
+    test_date = "2024-07-01"
+    test_food_names = ["김치찌개", "공기밥 1개", "계란말이 2조각"]
+
+    # 한 끼 음식 한 번에 추가 테스트
+    test_add_food_batch(test_user_id, test_date, test_food_names)
+
+    # 일괄 추가와 수정을 동시에 보내서 교착 상태가 없는지 확인 (FOOD_INDEX 1: 그 날 이미 있는 음식)
+    # update_food.py는 다른 포트로 띄운다: flask --app update_food run -p 5001
+    test_batch_with_concurrent_update(test_user_id, test_date, test_food_names, 1, "라면",
+                                      "http://localhost:5001/api/update_food")
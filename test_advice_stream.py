@@ -0,0 +1,32 @@
+import requests
+import json
+
+def test_get_advice_stream():
+    url = "http://localhost:5001/api/food/advice"
+    params = {
+        "year": 2023,
+        "month": 10,
+        "user_id": "상엽"  # 테스트할 사용자 ID
+    }
+    headers = {'Accept': 'text/event-stream'}
+
+    response = requests.get(url, params=params, headers=headers, stream=True)
+
+    if response.status_code != 200:
+        print("Error:", response.status_code, response.text)
+        return
+
+    # SSE 이벤트를 받는 대로 출력
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data = json.loads(line[len("data: "):])
+            if event == "token":
+                print(data["text"], end="", flush=True)
+            else:
+                print(f"\n[{event}]", json.dumps(data, ensure_ascii=False))
+
+if __name__ == '__main__':
+    test_get_advice_stream()
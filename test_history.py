@@ -0,0 +1,32 @@
+import requests
+import json
+
+def test_get_food_history():
+    url = "http://localhost:5001/api/food/history"
+    params = {
+        "start": "2023-01-01",
+        "end": "2024-12-31",
+        "user_id": "상엽"  # 테스트할 사용자 ID
+    }
+
+    response = requests.get(url, params=params, stream=True)
+
+    if response.status_code != 200:
+        print("Error:", response.status_code, response.text)
+        return
+
+    # 하루에 한 줄씩 받는 대로 출력
+    days = 0
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        data = json.loads(line)
+        if "error" in data:
+            print("Error:", data["error"])
+            break
+        days += 1
+        print(f"--- {data['date']} --- {len(data['foods'])} foods, {json.dumps(data['percentages'], ensure_ascii=False)}")
+    print(f"{days} days")
+
+if __name__ == '__main__':
+    test_get_food_history()
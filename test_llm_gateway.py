@@ -0,0 +1,68 @@
+# test_llm_gateway.py
+# Azure 없이 실행하는 게이트웨이 자리 확보(admission) 검증
+# half-open 시험 호출이 자리를 기다리다 취소되어도 자리/예산/시험 호출 표시가 남지 않아야 한다
+#
+# 사용법: python test_llm_gateway.py
+
+import time
+import asyncio
+
+import llm_gateway
+
+
+async def cancelled_probe_scenario():
+    gateway = llm_gateway.Gateway(global_concurrency=2, limits={"test": (1, 0, 6000)}, queue_timeout=5)
+    deployment = gateway.deployment("test")
+    breaker = deployment.breaker
+
+    # 배포 자리 하나를 다른 호출이 쓰고 있는 상태
+    busy = asyncio.Event()
+    done = asyncio.Event()
+
+    async def slow_call():
+        busy.set()
+        await done.wait()
+        return "slow"
+
+    holder = asyncio.create_task(gateway.acall("test", slow_call))
+    await busy.wait()
+
+    # 쿨다운이 끝난 열린 브레이커 - 다음 호출이 half-open 시험 호출이 된다
+    breaker.state = "open"
+    breaker.opened_at = time.monotonic() - breaker.cooldown - 1
+    tokens_before = deployment.tokens.tokens
+
+    async def probe_call():
+        return "probe"
+
+    probe = asyncio.create_task(gateway.acall("test", probe_call, estimate=100))
+    await asyncio.sleep(0.05)
+    assert breaker.state == "half_open" and breaker.probing, "probe should be waiting for a slot"
+
+    probe.cancel()
+    try:
+        await probe
+    except asyncio.CancelledError:
+        pass
+
+    assert not breaker.probing, "cancelled probe must release the half-open probe"
+    assert deployment.tokens.tokens >= tokens_before - 1, "reserved tokens must be refunded"
+    assert deployment.slots.in_use() == 1 and gateway.slots.in_use() == 1, "only the running call holds slots"
+    # 다른 호출이 다시 시험 호출을 할 수 있어야 한다 (예전에는 여기서 CircuitOpen: ... is recovering)
+    breaker.before_call("test")
+    breaker.record_abandoned()
+
+    done.set()
+    assert await holder == "slow"
+    assert deployment.slots.in_use() == 0 and gateway.slots.in_use() == 0
+
+    assert await gateway.acall("test", probe_call) == "probe"
+
+
+def test_cancelled_probe_releases_admission():
+    asyncio.run(cancelled_probe_scenario())
+
+
+if __name__ == '__main__':
+    test_cancelled_probe_releases_admission()
+    print("OK")
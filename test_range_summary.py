@@ -0,0 +1,25 @@
+import requests
+
+def test_get_range_summary(start, end):
+    url = "http://localhost:5001/api/food/range_summary"
+    params = {
+        "start": start,
+        "end": end,
+        "user_id": "상엽"  # 테스트할 사용자 ID
+    }
+
+    response = requests.get(url, params=params)
+
+    if response.status_code == 200:
+        data = response.json()
+        print(f"--- {start} ~ {end} ---")
+        print("Total:", data["total"])
+        print("Items:", data["item_count"], "Logged days:", data["logged_days"])
+        print("Average kcal per item:", data["average_kcal"])
+        print("Daily average:", data["daily_average"])
+    else:
+        print("Error:", response.status_code, response.text)
+
+if __name__ == '__main__':
+    test_get_range_summary("2024-07-01", "2024-07-31")
+    test_get_range_summary("2023-01-01", "2024-12-31")
@@ -0,0 +1,22 @@
+import requests
+import json
+
+def test_get_food_stats():
+    url = "http://localhost:5001/api/food/stats"
+    params = {
+        "start": "2023-01-01",
+        "end": "2024-12-31",
+        "user_id": "상엽",  # 테스트할 사용자 ID
+        "series": 0  # 요약만
+    }
+
+    response = requests.get(url, params=params)
+
+    if response.status_code == 200:
+        data = response.json()
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        print("Error:", response.status_code, response.text)
+
+if __name__ == '__main__':
+    test_get_food_stats()
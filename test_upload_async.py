@@ -0,0 +1,26 @@
+import time
+import requests
+
+# API 엔드포인트 URL
+url = 'http://localhost:5000/api/upload'
+
+# 파일 경로와 사용자 ID 설정
+file_path = '/Users/junseo/Documents/langchain-kr/img/fri.jpeg'
+user_id = '상엽'  # 테스트를 위한 사용자 ID
+
+# 파일과 데이터 준비 - async=1 이면 202와 job id를 바로 받는다
+files = {'file': open(file_path, 'rb')}
+data = {'user_id': user_id, 'async': '1'}
+
+response = requests.post(url, files=files, data=data)
+print(response.status_code, response.json())
+
+# 작업이 끝날 때까지 상태 조회
+status_url = 'http://localhost:5000' + response.json()['status_url']
+while True:
+    job = requests.get(status_url).json()
+    print(job['status'])
+    if job['status'] in ('done', 'failed'):
+        print(job)
+        break
+    time.sleep(1)
@@ -1,22 +1,17 @@
 from flask import Flask, request, jsonify
 import pymysql
-import os
+import db_pool
+import aggregates
 from dotenv import load_dotenv
 from llm import do as llm_do  # llm.py 파일에서 do 함수를 import
+import llm_gateway
 
 # 환경 변수 로드
 print("Loading .env file...")
 load_dotenv()
 
 app = Flask(__name__)
-
-# DB Connection
-db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
-}
+llm_gateway.init_app(app)
 
 @app.route('/api/add_food', methods=['POST'])
 def add_food():
@@ -32,13 +27,11 @@ def add_food():
     # LLM을 통해 음식 영양 정보를 가져옴
     nutrition_info = llm_do(food_name)
 
+    connection = db_pool.get_connection()
     try:
-        connection = pymysql.connect(**db_config)
         with connection.cursor() as cursor:
             # FOOD_INDEX를 구함 (해당 날짜의 가장 높은 인덱스를 찾아 +1)
-            cursor.execute("SELECT MAX(FOOD_INDEX) FROM FOOD WHERE ID = %s AND DATE = %s", (user_id, date))
-            max_index = cursor.fetchone()[0]
-            food_index = max_index + 1 if max_index is not None else 0
+            food_index = aggregates.next_food_index(cursor, user_id, date)
 
             insert_query = """
             INSERT INTO FOOD (ID, DATE, FOOD_INDEX, FOOD_NAME, FOOD_CH, FOOD_PT, FOOD_FAT, FOOD_KCAL)
@@ -52,6 +45,8 @@ def add_food():
                 nutrition_info['fat'],
                 nutrition_info['calorie']
             ))
+            # 같은 트랜잭션에서 USER_NT 일별 합계 갱신
+            aggregates.on_food_insert(cursor, user_id, date, nutrition_info)
             connection.commit()
 
             added_food_info = {
@@ -88,9 +83,12 @@ def update_food():
     # LLM을 통해 새로운 음식 영양 정보를 가져옴
     new_nutrition_info = llm_do(new_food_name)
 
+    connection = db_pool.get_connection()
     try:
-        connection = pymysql.connect(**db_config)
         with connection.cursor() as cursor:
+            # UPDATE 전에 이전 값을 읽어 USER_NT 일별 합계에 차이만큼 반영
+            aggregates.on_food_update(cursor, user_id, date, food_index, new_nutrition_info)
+
             update_query = """
             UPDATE FOOD
             SET FOOD_NAME = %s, FOOD_CH = %s, FOOD_PT = %s, FOOD_FAT = %s, FOOD_KCAL = %s
@@ -1,44 +1,74 @@
 from flask import Flask, request, jsonify
-import pymysql
+import db_pool
+import aggregates
+import image_pipeline
+import upload_jobs
 import os
+import logging
 from dotenv import load_dotenv
 from datetime import datetime
 import upload_llm as llm
+import llm_gateway
 
 load_dotenv()
 
 app = Flask(__name__)
+llm_gateway.init_app(app)
+# 업로드를 임시 파일 없이 메모리로 받고, 본문 크기를 제한
+app.request_class = image_pipeline.InMemoryRequest
+app.config['MAX_CONTENT_LENGTH'] = image_pipeline.MAX_UPLOAD_BYTES
 
-# DB Connection
-db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
-}
+# true면 'async' 필드가 없어도 업로드를 백그라운드 작업으로 처리
+UPLOAD_ASYNC = os.getenv('UPLOAD_ASYNC', 'false').lower() in ('1', 'true', 'yes')
 
-def save_to_db(user_id, nutrition_info):
-    connection = pymysql.connect(**db_config)
+def save_to_db(user_id, nutrition_info, job_id=None):
+    # job_id: 백그라운드 작업으로 저장할 때 - 같은 작업이 다시 실행되어도(워커 장애 후 복구) 한 번만 저장한다
+    connection = db_pool.get_connection()
+    now = datetime.now()
     try:
         with connection.cursor() as cursor:
+            # 다른 FOOD 쓰기와 같은 순서(USER -> FOOD)로 잠근다
+            aggregates.lock_user(cursor, user_id)
+            if job_id is not None:
+                # 이미 저장된 작업인지 확인
+                cursor.execute("SELECT 1 FROM FOOD WHERE UPLOAD_JOB_ID = %s", (job_id,))
+                if cursor.fetchone():
+                    logging.info(f"Upload job {job_id} was already saved")
+                    return
             sql = """
-                INSERT INTO FOOD (ID, DATE, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO FOOD (ID, DATE, FOOD_NAME, FOOD_PT, FOOD_FAT, FOOD_CH, FOOD_KCAL, UPLOAD_JOB_ID)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """
             cursor.execute(sql, (
                 user_id,
-                datetime.now(),  # 현재 날짜와 시간 저장
+                now,  # 현재 날짜와 시간 저장
                 nutrition_info['food_name'],
                 nutrition_info['protein'],
                 nutrition_info['fat'],
                 nutrition_info['carbohydrate'],
-                nutrition_info['calorie']
+                nutrition_info['calorie'],
+                job_id
             ))
+            # 같은 트랜잭션에서 USER_NT 일별 합계 갱신
+            aggregates.on_food_insert(cursor, user_id, now, nutrition_info)
             print("Data saved to database")  # Debugging 출력 추가
         connection.commit()
     finally:
         connection.close()
 
+def process_upload(payload):
+    # 백그라운드 워커에서 실행 - 동기 업로드와 같은 분석/저장 과정
+    nutrition_info = llm.do(payload['image'], digest=payload['digest'], mode=payload.get('mode'))
+    if 'error' in nutrition_info:
+        return nutrition_info
+    save_to_db(payload['user_id'], nutrition_info, job_id=payload.get('job_id'))
+    return nutrition_info
+
+jobs = upload_jobs.JobQueue(process_upload)
+# redis 큐는 재시작 전에 남은 작업이 있을 수 있으므로 업로드를 기다리지 않고 바로 워커를 띄운다
+if upload_jobs.UPLOAD_JOB_BACKEND == 'redis':
+    jobs.start()
+
 @app.route('/api/upload', methods=['POST'])
 def upload():
     user_id = request.form.get('user_id')
@@ -49,11 +79,27 @@ def upload():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
+    # 분석 방식 (two_step / one_shot), 없으면 서버 기본값
+    mode = request.form.get('mode')
+    if mode and mode not in llm.MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(llm.MODES)}"}), 400
+
     if file:
-        file_path = os.path.join("/tmp", file.filename)
-        file.save(file_path)
+        # 디스크에 저장하지 않고 읽으면서 내용 해시를 계산 - 같은 사진을 다시 올리면 캐시된 결과를 쓴다
+        image_bytes, digest = image_pipeline.read_upload(file)
 
-        nutrition_info = llm.do(file_path)
+        # 'async' 필드가 있으면 그 값을, 없으면 서버 기본값을 따른다
+        run_async = request.form.get('async')
+        run_async = run_async.lower() in ('1', 'true', 'yes') if run_async is not None else UPLOAD_ASYNC
+        if run_async:
+            try:
+                job_id = jobs.submit({"user_id": user_id, "image": image_bytes, "digest": digest, "mode": mode})
+            except upload_jobs.QueueFull:
+                return jsonify({"error": "Too many pending uploads, try again later"}), 503
+            status_url = f"/api/upload/jobs/{job_id}"
+            return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
+        nutrition_info = llm.do(image_bytes, digest=digest, mode=mode)
         
         if 'error' in nutrition_info:
             return jsonify(nutrition_info), 400
@@ -62,5 +108,12 @@ def upload():
         
         return jsonify(nutrition_info)
 
+@app.route('/api/upload/jobs/<job_id>', methods=['GET'])
+def upload_job_status(job_id):
+    record = jobs.status(job_id)
+    if record is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(dict(record, job_id=job_id))
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,311 @@
+# upload_jobs.py
+# 업로드 분석을 요청과 분리해서 백그라운드로 처리하는 작업 큐
+# - submit()은 작업을 큐에 넣고 바로 job id를 돌려준다 (API는 202 응답)
+# - 고정 크기 워커 스레드 풀이 큐에서 작업을 꺼내 handler(payload)를 실행한다
+# - status()로 queued / running / done / failed 상태와 결과를 조회한다
+#
+# 백엔드 (UPLOAD_JOB_BACKEND)
+#   memory: 프로세스 내 큐 - 설치가 필요 없지만 프로세스가 재시작되면 작업이 사라지고,
+#           상태 조회도 작업을 받은 프로세스에서만 가능하다
+#   redis:  Redis(호환) 리스트 - 꺼낸 작업은 처리 중 리스트로 옮겨 두었다가 완료 후 지운다.
+#           워커가 죽으면 임대(lease)가 만료된 작업을 다시 큐로 돌려서 재시도한다.
+#           처리 중에는 임대를 주기적으로 연장하므로 오래 걸리는 작업이 중복 실행되지 않는다.
+# 작업이 다시 실행될 수 있으므로(워커가 죽은 경우) handler는 payload["job_id"]로 중복 저장을 막아야 한다.
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+
+UPLOAD_JOB_BACKEND = os.getenv('UPLOAD_JOB_BACKEND', 'memory')
+UPLOAD_JOB_WORKERS = int(os.getenv('UPLOAD_JOB_WORKERS', '4'))           # 워커 스레드 수
+UPLOAD_JOB_QUEUE_MAX = int(os.getenv('UPLOAD_JOB_QUEUE_MAX', '1000'))    # 대기 중 작업 최대 수
+UPLOAD_JOB_TTL = int(os.getenv('UPLOAD_JOB_TTL', '86400'))               # 상태/결과 보관 시간(초)
+UPLOAD_JOB_LEASE = int(os.getenv('UPLOAD_JOB_LEASE', '300'))             # 처리 중 작업 임대 시간(초)
+UPLOAD_JOB_MAX_ATTEMPTS = int(os.getenv('UPLOAD_JOB_MAX_ATTEMPTS', '3'))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+POLL_TIMEOUT = 1  # 큐가 비었을 때 한 번에 기다리는 시간(초)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MemoryBackend:
+    def __init__(self, max_size=UPLOAD_JOB_QUEUE_MAX, ttl=UPLOAD_JOB_TTL):
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._records = {}  # job id -> (만료 시각, 상태)
+
+    def push(self, job_id, payload, record):
+        self.set_status(job_id, record)
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except queue.Full:
+            with self._lock:
+                self._records.pop(job_id, None)
+            raise QueueFull()
+
+    def reserve(self, timeout=POLL_TIMEOUT):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def ack(self, job_id):
+        pass
+
+    def renew(self, job_id):
+        pass
+
+    def set_status(self, job_id, record):
+        now = time.monotonic()
+        with self._lock:
+            self._records[job_id] = (now + self.ttl, record)
+            # 만료된 상태 정리
+            for expired in [key for key, (expires, _) in self._records.items() if expires < now]:
+                del self._records[expired]
+
+    def get_status(self, job_id):
+        with self._lock:
+            item = self._records.get(job_id)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def recover(self):
+        return 0
+
+    def pending(self):
+        return self._queue.qsize()
+
+
+class RedisBackend:
+    # 키 구성
+    #   {prefix}:queue            대기 리스트 (LPUSH로 넣고 오른쪽에서 꺼냄)
+    #   {prefix}:processing       처리 중 리스트 (CLAIM_SCRIPT로 옮기면서 같은 명령 안에서 임대를 건다)
+    #   {prefix}:ready            작업이 들어왔다는 신호 리스트 - 워커는 여기서 BLPOP으로 기다린다
+    #   {prefix}:payload:{id}     작업 입력 JSON
+    #   {prefix}:image:{id}       작업 입력 중 이미지 바이트 (JSON에 넣지 않고 그대로 저장)
+    #   {prefix}:status:{id}      상태 JSON
+    #   {prefix}:lease:{id}       처리 중인 워커가 살아 있다는 표시 (만료되면 복구 대상)
+    # 대기 리스트 -> 처리 중 리스트 이동과 임대 설정을 한 번에 실행한다.
+    # 따로 실행하면 그 사이에 다른 프로세스의 recover()가 임대 없는 작업으로 보고 되돌려서 같은 작업이 두 번 실행된다.
+    # (BRPOPLPUSH 같은 블로킹 명령은 스크립트/MULTI 안에서 기다리지 않으므로, 기다리기는 ready 리스트로 따로 한다)
+    CLAIM_SCRIPT = """
+        local job_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+        if job_id then
+            redis.call('SET', ARGV[1] .. job_id, '1', 'EX', ARGV[2])
+        end
+        return job_id
+    """
+
+    def __init__(self, url=REDIS_URL, prefix='upload_jobs', max_size=UPLOAD_JOB_QUEUE_MAX,
+                 ttl=UPLOAD_JOB_TTL, lease=UPLOAD_JOB_LEASE, max_attempts=UPLOAD_JOB_MAX_ATTEMPTS):
+        import redis  # redis 백엔드를 쓸 때만 필요
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.queue_key = f"{prefix}:queue"
+        self.processing_key = f"{prefix}:processing"
+        self.ready_key = f"{prefix}:ready"
+        self._claim = self.client.register_script(self.CLAIM_SCRIPT)
+
+    def _key(self, kind, job_id):
+        return f"{self.prefix}:{kind}:{job_id}"
+
+    def push(self, job_id, payload, record):
+        if self.client.llen(self.queue_key) >= self.max_size:
+            raise QueueFull()
+        payload = dict(payload, attempts=0)
+        image = payload.pop("image", None)
+        pipe = self.client.pipeline()
+        if image is not None:
+            pipe.set(self._key("image", job_id), image, ex=self.ttl)
+        pipe.set(self._key("payload", job_id), json.dumps(payload, ensure_ascii=False), ex=self.ttl)
+        pipe.set(self._key("status", job_id), json.dumps(record, ensure_ascii=False), ex=self.ttl)
+        pipe.lpush(self.queue_key, job_id)
+        self._signal(pipe)
+        pipe.execute()
+
+    def _signal(self, pipe):
+        # 남는 신호는 헛걸음 한 번일 뿐이므로 개수만 제한한다
+        pipe.lpush(self.ready_key, 1)
+        pipe.ltrim(self.ready_key, 0, self.max_size - 1)
+
+    def _claim_next(self):
+        return self._claim(keys=[self.queue_key, self.processing_key], args=[self._key("lease", ""), self.lease])
+
+    def reserve(self, timeout=POLL_TIMEOUT):
+        # 쌓여 있는 작업은 바로 꺼내고, 비어 있으면 신호를 기다렸다가 다시 꺼내 본다
+        # (신호를 놓쳐도 timeout마다 한 번씩 확인하므로 작업이 묻히지 않는다)
+        deadline = time.monotonic() + timeout
+        job_id = self._claim_next()
+        while job_id is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self.client.blpop(self.ready_key, remaining)
+            job_id = self._claim_next()
+        job_id = job_id.decode()
+        data = self.client.get(self._key("payload", job_id))
+        if data is None:
+            # 입력이 만료된 작업은 버린다
+            self.ack(job_id)
+            return None
+        payload = json.loads(data)
+        payload["attempts"] += 1
+        self.client.set(self._key("payload", job_id), json.dumps(payload, ensure_ascii=False), ex=self.ttl)
+        image = self.client.get(self._key("image", job_id))
+        if image is not None:
+            payload["image"] = image
+        return job_id, payload
+
+    def ack(self, job_id):
+        pipe = self.client.pipeline()
+        pipe.lrem(self.processing_key, 1, job_id)
+        pipe.delete(self._key("payload", job_id), self._key("image", job_id), self._key("lease", job_id))
+        pipe.execute()
+
+    def renew(self, job_id):
+        self.client.set(self._key("lease", job_id), "1", ex=self.lease)
+
+    def set_status(self, job_id, record):
+        self.client.set(self._key("status", job_id), json.dumps(record, ensure_ascii=False), ex=self.ttl)
+
+    def get_status(self, job_id):
+        data = self.client.get(self._key("status", job_id))
+        return json.loads(data) if data else None
+
+    def recover(self):
+        # 임대가 만료된(=처리하던 워커가 죽은) 작업을 대기 리스트 맨 앞으로 되돌린다
+        recovered = 0
+        for job_id in self.client.lrange(self.processing_key, 0, -1):
+            job_id = job_id.decode()
+            if self.client.exists(self._key("lease", job_id)):
+                continue
+            # 다른 프로세스가 먼저 옮겼으면 lrem이 0을 반환
+            if self.client.lrem(self.processing_key, 1, job_id):
+                pipe = self.client.pipeline()
+                pipe.rpush(self.queue_key, job_id)
+                self._signal(pipe)
+                pipe.execute()
+                recovered += 1
+        if recovered:
+            logging.warning(f"Recovered {recovered} upload jobs from dead workers")
+        return recovered
+
+    def pending(self):
+        return self.client.llen(self.queue_key)
+
+
+BACKENDS = {"memory": MemoryBackend, "redis": RedisBackend}
+
+
+class JobQueue:
+    # handler(payload) -> 결과 dict. 결과에 "error"가 있으면 실패로 기록한다.
+    def __init__(self, handler, backend=None, workers=UPLOAD_JOB_WORKERS, lease=UPLOAD_JOB_LEASE):
+        self.handler = handler
+        self.backend = backend or BACKENDS[UPLOAD_JOB_BACKEND]()
+        self.workers = workers
+        self.lease = lease
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        # 처음 submit()할 때 또는 앱 시작 시 한 번 호출된다
+        with self._lock:
+            if self._threads:
+                return
+            self.backend.recover()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"upload-job-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stopping.set()
+
+    def submit(self, payload):
+        self.start()
+        job_id = uuid.uuid4().hex
+        # handler가 중복 실행을 알아챌 수 있도록 job id를 함께 넘긴다
+        self.backend.push(job_id, dict(payload, job_id=job_id), _record("queued"))
+        return job_id
+
+    def status(self, job_id):
+        return self.backend.get_status(job_id)
+
+    def _work(self):
+        last_recover = time.monotonic()
+        while not self._stopping.is_set():
+            job = self.backend.reserve()
+            if job is None:
+                # 한가할 때 죽은 워커의 작업을 주기적으로 되살린다
+                if time.monotonic() - last_recover > self.lease:
+                    self.backend.recover()
+                    last_recover = time.monotonic()
+                continue
+            job_id, payload = job
+            self._run(job_id, payload)
+
+    def _run(self, job_id, payload):
+        record = self.backend.get_status(job_id) or _record("queued")
+        if record["status"] in ("done", "failed"):
+            # 완료 기록 후 ack 전에 죽었다가 복구된 작업 - 다시 실행하지 않는다
+            self.backend.ack(job_id)
+            return
+
+        attempts = payload.get("attempts", 1)
+        max_attempts = getattr(self.backend, "max_attempts", None)
+        if max_attempts and attempts > max_attempts:
+            self.backend.set_status(job_id, _record("failed", error="Too many attempts", created_at=record["created_at"]))
+            self.backend.ack(job_id)
+            return
+
+        self.backend.set_status(job_id, _record("running", created_at=record["created_at"]))
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, finished),
+                                     name=f"upload-job-lease-{job_id[:8]}", daemon=True)
+        heartbeat.start()
+        try:
+            result = self.handler(payload)
+            if "error" in result:
+                record = _record("failed", error=result["error"], created_at=record["created_at"])
+            else:
+                record = _record("done", result=result, created_at=record["created_at"])
+        except Exception as e:
+            logging.exception(f"Upload job {job_id} failed")
+            record = _record("failed", error=str(e), created_at=record["created_at"])
+        finally:
+            finished.set()
+        self.backend.set_status(job_id, record)
+        self.backend.ack(job_id)
+
+    def _heartbeat(self, job_id, finished):
+        # handler가 실행되는 동안 임대를 연장 - 임대 시간보다 오래 걸려도 recover()가 작업을 되돌리지 않는다
+        interval = max(1, self.lease / 3)
+        while not finished.wait(interval):
+            try:
+                self.backend.renew(job_id)
+            except Exception as e:
+                logging.warning(f"Failed to renew lease for upload job {job_id}: {e}")
+
+
+def _record(status, result=None, error=None, created_at=None):
+    now = time.time()
+    record = {"status": status, "created_at": created_at or now, "updated_at": now}
+    if result is not None:
+        record["result"] = result
+    if error is not None:
+        record["error"] = error
+    return record
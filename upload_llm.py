@@ -1,7 +1,7 @@
-import base64
-from io import BytesIO
-from PIL import Image
+import hashlib
+import asyncio
 import os
+import logging
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
 from langchain_openai import AzureChatOpenAI
@@ -9,17 +9,31 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.output_parsers import JsonOutputParser
 import json
+import nutrition_cache
+import food_db
+import image_pipeline
+import async_llm
+import singleflight
+import hedging
+import llm_gateway
 
 load_dotenv()
 
+# 업로드 분석 방식
+# two_step: 이미지 -> 음식 이름, 음식 이름 -> 영양 정보 (모델 호출 2번)
+# one_shot: 이미지 -> 음식 이름 + 영양 정보 (모델 호출 1번)
+MODES = ("two_step", "one_shot")
+UPLOAD_LLM_MODE = os.getenv("UPLOAD_LLM_MODE", "two_step")
+
 # OpenAI 설정
-model = AzureChatOpenAI(
+model = llm_gateway.GatewayChatModel(AzureChatOpenAI(
     azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),  # gpt-4o is set by env
     temperature=1.0,
     openai_api_key=os.getenv("AZURE_OPENAI_API_KEY"),
     openai_api_version=os.getenv("OPENAI_API_VERSION"),
     azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-)
+    max_retries=0,
+))
 
 # 영양 정보 모델 정의
 class NutritionInfo(BaseModel):
@@ -31,6 +45,12 @@ class NutritionInfo(BaseModel):
 
 output_parser = JsonOutputParser(pydantic_object=NutritionInfo)
 
+# 한 번의 호출로 이미지에서 바로 영양 정보까지 받을 때의 출력 형식
+class ImageNutritionInfo(NutritionInfo):
+    food_name: str = Field(description="The name of the food in the image, in Korean")
+
+one_shot_output_parser = JsonOutputParser(pydantic_object=ImageNutritionInfo)
+
 # 프롬프트 템플릿
 prompt_template = ChatPromptTemplate.from_template(
     """
@@ -44,12 +64,48 @@ prompt_template = ChatPromptTemplate.from_template(
     """
 ).partial(format_instructions=output_parser.get_format_instructions())
 
-def convert_to_base64(image_path):
-    with Image.open(image_path) as image:
-        buffered = BytesIO()
-        image.save(buffered, format="JPEG")
-        img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return img_str
+# 이미지에서 음식 이름을 뽑는 프롬프트
+food_name_prompt = """
+    다음 이미지를 설명하세요. 음식 이름을 추출하여 JSON 형식으로 반환해주세요.
+    추출할 정보:
+    - 음식이름: 한글로 음식 이름
+    반환 형식:
+    {
+    "음식": "음식 이름"
+    }
+    """
+
+# 이미지에서 음식 이름과 영양 정보를 한 번에 뽑는 프롬프트
+one_shot_prompt = f"""
+    다음 이미지에 있는 음식의 이름을 한글로 추출하고 영양정보(이름, 칼로리, 탄수화물, 단백질, 지방)를 분석해줘
+    예를 들어 돈까스 2개가 있는 사진이면, (돈까스, 1400,50,90,60) 이런식으로 출력해줘
+    또 다른 예시로 에너지바 1개가 있는 사진이면, 출력은 (에너지바, 200,20,12,10) 이런식으로 출력해줘
+
+    {one_shot_output_parser.get_format_instructions()}
+    """
+
+# 이미지 내용(SHA-256) -> 추출한 음식 이름과 영양 정보 캐시
+# 같은 사진을 다시 올리면 모델을 호출하지 않는다. 프롬프트가 바뀌면 버전이 바뀐다.
+image_cache = nutrition_cache.TwoTierCache(
+    "image",
+    version=nutrition_cache.prompt_version(food_name_prompt, one_shot_prompt,
+                                           prompt_template.invoke({"string": ""}).to_string(),
+                                           os.getenv("AZURE_OPENAI_DEPLOYMENT")),
+)
+
+# image: 업로드된 이미지 바이트 또는 파일 경로
+def load_image_bytes(image):
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    with open(image, "rb") as f:
+        return f.read()
+
+def image_digest(image):
+    return hashlib.sha256(load_image_bytes(image)).hexdigest()
+
+def convert_to_base64(image):
+    # 비전 모델에 맞게 줄인 JPEG을 메모리에서 바로 base64로 인코딩
+    return image_pipeline.to_base64(image_pipeline.prepare_image(load_image_bytes(image)))
 
 def create_prompt(image_base64, text_prompt):
     message = HumanMessage(
@@ -65,25 +121,16 @@ def create_prompt(image_base64, text_prompt):
     )
     return [message]
 
+# 동시 호출 수 제한 + 호출별 타임아웃 클라이언트, 그 위에 마감 시간/헤지
+vision_client = hedging.HedgedClient(async_llm.AsyncLLMClient(model))
+nutrition_client = hedging.HedgedClient(async_llm.AsyncLLMClient(prompt_template | model | output_parser))
+
 def invoke_model(message):
-    result = model.invoke(message)
+    result = vision_client.invoke(message)
     return result
 
-def extract_food_name_from_image(image_path):
-    image_base64 = convert_to_base64(image_path)
-    text_prompt = """
-    다음 이미지를 설명하세요. 음식 이름을 추출하여 JSON 형식으로 반환해주세요.
-    추출할 정보:
-    - 음식이름: 한글로 음식 이름
-    반환 형식:
-    {
-    "음식": "음식 이름"
-    }
-    """
-    message = create_prompt(image_base64, text_prompt)
-    response = invoke_model(message)
-    
-    # 응답을 JSON 형식으로 변환
+# 응답을 JSON 형식으로 변환해서 음식 이름을 꺼낸다
+def parse_food_name(response):
     def parse_response_to_json(response):
         try:
             response_text = response.content
@@ -100,17 +147,127 @@ def extract_food_name_from_image(image_path):
         print(f"Unexpected response format: {response_json}")  # Debugging 출력 추가
         return ""
 
-def do(image_path):
-    food_name = extract_food_name_from_image(image_path)
+def extract_food_name_from_image(image):
+    image_base64 = convert_to_base64(image)
+    message = create_prompt(image_base64, food_name_prompt)
+    response = invoke_model(message)
+    return parse_food_name(response)
+
+def analyze_two_step(image):
+    food_name = extract_food_name_from_image(image)
     print(f"Extracted food name: {food_name}")  # Debugging 출력 추가
     
     if not food_name:
         return {"error": "Food name could not be extracted."}
+
+    # 인식한 음식 이름이 참조 테이블에 있으면 두 번째 LLM 호출을 생략
+    local = food_db.lookup(food_name)
+    if local is not None:
+        local["food_name"] = food_name
+        logging.debug(f"Food DB output: {local}")
+        return local
     
-    prompt_value = prompt_template.invoke({"string": food_name})
-    model_output = model.invoke(prompt_value)
-    output = output_parser.invoke(model_output)
-    output_dict = output  # 이미 딕셔너리 형태로 반환됨
+    output_dict = nutrition_client.invoke({"string": food_name})  # 이미 딕셔너리 형태로 반환됨
     output_dict["food_name"] = food_name  # 음식 이름을 추가
     print(f"Parsed output: {output_dict}")  # Debugging 출력 추가
-    return output_dict
\ No newline at end of file
+    return output_dict
+
+def parse_one_shot(response):
+    try:
+        output = one_shot_output_parser.invoke(response)
+    except Exception as e:
+        logging.debug(f"Unexpected response format: {response.content}")
+        return {"error": f"Nutrition could not be extracted: {e}"}
+
+    if not output.get("food_name", "").strip():
+        return {"error": "Food name could not be extracted."}
+
+    output_dict = {key: output.get(key) for key in ImageNutritionInfo.__fields__}
+    logging.debug(f"Parsed output: {output_dict}")
+    return output_dict
+
+def analyze_one_shot(image):
+    image_base64 = convert_to_base64(image)
+    message = create_prompt(image_base64, one_shot_prompt)
+    response = invoke_model(message)
+    return parse_one_shot(response)
+
+ANALYZERS = {
+    "two_step": analyze_two_step,
+    "one_shot": analyze_one_shot,
+}
+
+# 같은 사진(내용 해시)의 분석이 진행 중이면 그 결과를 함께 기다린다
+flight = singleflight.Group("image")
+
+def analyze(image, digest, mode):
+    cached = image_cache.get(digest)
+    if cached is not None:
+        logging.debug(f"Cached output for image {digest[:12]}: {cached}")
+        return cached
+
+    output_dict = ANALYZERS[mode](image)
+    if "error" not in output_dict:
+        image_cache.set(digest, output_dict)
+    return output_dict
+
+def do(image, digest=None, mode=None):
+    # image: 업로드된 이미지 바이트 또는 파일 경로
+    # digest: 업로드하면서 계산한 SHA-256 (없으면 이미지를 읽어 계산)
+    # mode: 요청별 분석 방식 (없으면 UPLOAD_LLM_MODE)
+    mode = mode or UPLOAD_LLM_MODE
+    if mode not in ANALYZERS:
+        return {"error": f"Unknown mode: {mode}. Use one of {', '.join(MODES)}."}
+
+    digest = digest or image_digest(image)
+    # 결과를 여러 요청이 공유하므로 복사해서 반환
+    return dict(flight.do(digest, lambda: analyze(image, digest, mode)))
+
+async def aanalyze_two_step(image, timeout=None):
+    image_base64 = await asyncio.to_thread(convert_to_base64, image)
+    response = await vision_client.ainvoke(create_prompt(image_base64, food_name_prompt), timeout)
+    food_name = parse_food_name(response)
+    logging.debug(f"Extracted food name: {food_name}")
+
+    if not food_name:
+        return {"error": "Food name could not be extracted."}
+
+    local = food_db.lookup(food_name)
+    if local is not None:
+        local["food_name"] = food_name
+        logging.debug(f"Food DB output: {local}")
+        return local
+
+    output_dict = await nutrition_client.ainvoke({"string": food_name}, timeout)
+    output_dict["food_name"] = food_name  # 음식 이름을 추가
+    logging.debug(f"Parsed output: {output_dict}")
+    return output_dict
+
+async def aanalyze_one_shot(image, timeout=None):
+    image_base64 = await asyncio.to_thread(convert_to_base64, image)
+    response = await vision_client.ainvoke(create_prompt(image_base64, one_shot_prompt), timeout)
+    return parse_one_shot(response)
+
+ASYNC_ANALYZERS = {
+    "two_step": aanalyze_two_step,
+    "one_shot": aanalyze_one_shot,
+}
+
+async def aanalyze(image, digest, mode, timeout=None):
+    cached = await asyncio.to_thread(image_cache.get, digest)
+    if cached is not None:
+        logging.debug(f"Cached output for image {digest[:12]}: {cached}")
+        return cached
+
+    output_dict = await ASYNC_ANALYZERS[mode](image, timeout)
+    if "error" not in output_dict:
+        await asyncio.to_thread(image_cache.set, digest, output_dict)
+    return output_dict
+
+async def ado(image, digest=None, mode=None, timeout=None):
+    mode = mode or UPLOAD_LLM_MODE
+    if mode not in ASYNC_ANALYZERS:
+        return {"error": f"Unknown mode: {mode}. Use one of {', '.join(MODES)}."}
+
+    digest = digest or image_digest(image)
+    return dict(await flight.ado(digest, lambda: aanalyze(image, digest, mode, timeout), timeout))
\ No newline at end of file